@@ -0,0 +1,448 @@
+"""
+JSON analytics API for the AQI Dashboard
+A dependency-free WSGI app (``app``) serving the dashboard's results to other
+tools. It calls the same process-wide engine and caches as the Streamlit
+pages, and keeps each serialized response so repeat requests skip both the
+computation and the JSON encoding.
+
+Responses carry a strong ETag (dataset version + normalized parameters) and
+Cache-Control headers. Parameters are validated and put in canonical form
+(defaults filled in, unknown names dropped) before anything else, so an
+error is never turned into a 304; a matching ``If-None-Match`` then gets a
+304 without the body being computed or serialized.
+
+Vercel routes every request here (see vercel.json). To run it locally:
+``python api/index.py`` (or any WSGI server, e.g. ``gunicorn api.index:app``).
+
+Endpoints (GET, all parameters optional unless noted):
+    /api/health          liveness and dataset version
+    /api/ready           200 once warm-up (started with the server or by the first request) has finished
+                         (``warm_up_failed`` names the step that stopped it), else 503
+    /api/cache           hits, bytes and evictions of every result cache
+                         against the AIRRISK_CACHE_MB budget; entries (0-50)
+                         also lists each cache's largest entries
+    /api/meta            years, states and endpoint list
+    /api/stats           county statistics        year_min, year_max, state
+    /api/classification  risk categories          year_min, year_max, state, percentile, category
+    /api/severity        Severity Score ranking   year_min, year_max, state, n
+    /api/thresholds      percentile thresholds    year_min, year_max, state, percentile
+    /api/drilldown       one county's profile     state, county (required), year_min, year_max, percentile
+"""
+
+import hashlib
+import json
+import os
+import sys
+from http import HTTPStatus
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIServer, make_server
+
+# The analytics modules live in the dashboard directory
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(API_DIR), 'streamlit_dashboard'))
+
+from analytics import ALL_STATES, RISK_LABELS, classify_risk, get_rank_index, get_threshold_table, get_year_cube  # noqa: E402
+from cache import BoundedCache, cache_budget, cache_report  # noqa: E402
+from data import dataset_version  # noqa: E402
+from engine import get_engine  # noqa: E402
+from exports import METHODOLOGY_VERSION  # noqa: E402
+from warmup import is_ready, warm_up_failure, warm_up_in_background  # noqa: E402
+
+# Serialized responses kept across all requests in the process. Traffic is
+# dominated by a few popular queries, so the least frequently used go first.
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_BYTES = cache_budget(0.15)
+
+DEFAULT_PERCENTILE = 90
+DEFAULT_TOP_N = 50
+MAX_TOP_N = 5000
+
+# Largest entries listed per cache by /api/cache?entries=
+MAX_CACHE_ENTRIES = 50
+
+CLASSIFICATION_COLUMNS = ['State', 'County', 'county_id', 'mean_median_aqi', 'mean_max_aqi', 'Risk_Category']
+SEVERITY_COLUMNS = ['State', 'County', 'county_id', 'mean_median_aqi', 'mean_max_aqi',
+                    'norm_median', 'norm_max', 'severity_score',
+                    'Chronic_Rank', 'Acute_Rank', 'Severity_Rank']
+
+# Query parameters each endpoint reads; anything else is ignored and kept
+# out of the cache key
+ENDPOINT_PARAMS = {
+    'stats': ('years', 'state'),
+    'classification': ('years', 'state', 'percentile', 'category'),
+    'severity': ('years', 'state', 'n'),
+    'thresholds': ('years', 'state', 'percentile'),
+    'drilldown': ('years', 'state', 'county', 'percentile'),
+    'caches': ('entries',),
+}
+
+# Responses only change with the data files (i.e. on deploy), so browsers may
+# reuse them for a while and CDNs / reverse proxies for longer, revalidating
+# in the background with the ETag.
+CACHE_CONTROL = 'public, max-age=300, s-maxage=3600, stale-while-revalidate=86400'
+NO_STORE = 'no-store'
+
+_responses = BoundedCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_BYTES, 'lfu', name='api')
+
+
+class ApiError(Exception):
+    """Request error returned to the client as ``{"error": message}``."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = HTTPStatus(status)
+        self.message = message
+
+
+# =============================================================================
+# PARAMETERS
+# =============================================================================
+def _int_param(params, name, default, low, high):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer") from None
+    if not low <= value <= high:
+        raise ApiError(400, f"'{name}' must be between {low} and {high}")
+    return value
+
+
+def _years(params):
+    years = get_year_cube().years
+    first, last = int(years[0]), int(years[-1])
+    year_min = _int_param(params, 'year_min', first, first, last)
+    year_max = _int_param(params, 'year_max', last, year_min, last)
+    return year_min, year_max
+
+
+def _state(params):
+    state = params.get('state') or None
+    if state == ALL_STATES:
+        return None
+    if state is not None and state not in get_rank_index().counties_by_state:
+        raise ApiError(404, f"Unknown state: {state!r}")
+    return state
+
+
+def _scope(params):
+    """``(year_min, year_max, state)``; a missing state means the national scope."""
+    return (*_years(params), _state(params))
+
+
+def _percentile(params):
+    return _int_param(params, 'percentile', DEFAULT_PERCENTILE, 0, 100)
+
+
+def _category(params):
+    category = params.get('category')
+    if category is not None and category not in RISK_LABELS:
+        raise ApiError(400, f"'category' must be one of {RISK_LABELS}")
+    return category
+
+
+def _county(params, state, year_min, year_max):
+    """County id of a drilldown request that has data in the year range."""
+    county = params.get('county')
+    if state is None or not county:
+        raise ApiError(400, "'state' and 'county' are required")
+    county_id = get_rank_index().counties_by_state[state].get(county)
+    if county_id is None:
+        raise ApiError(404, f"Unknown county: {county!r} in {state!r}")
+    cube = get_year_cube()
+    if not cube.present(year_min, year_max)[cube.dimension.positions(county_id)]:
+        raise ApiError(404, f"No data for {county}, {state} in {year_min}-{year_max}")
+    return county_id
+
+
+def canonical_params(endpoint_name, params):
+    """Validated parameters of an endpoint with every default filled in.
+
+    Raises ApiError for invalid values. Equivalent requests (``percentile``
+    missing or ``90``, stray parameters) give equal results, and so share
+    one ETag and one cached response.
+    """
+    names = ENDPOINT_PARAMS.get(endpoint_name, ())
+    canonical = {}
+    if 'years' in names:
+        canonical['year_min'], canonical['year_max'] = _years(params)
+    if 'state' in names:
+        canonical['state'] = _state(params)
+    if 'percentile' in names:
+        canonical['percentile'] = _percentile(params)
+    if 'n' in names:
+        canonical['n'] = _int_param(params, 'n', DEFAULT_TOP_N, 1, MAX_TOP_N)
+    if 'category' in names:
+        canonical['category'] = _category(params)
+    if 'entries' in names:
+        canonical['entries'] = _int_param(params, 'entries', 0, 0, MAX_CACHE_ENTRIES)
+    if 'county' in names:
+        _county(params, canonical['state'], canonical['year_min'], canonical['year_max'])
+        canonical['county'] = params['county']
+    return canonical
+
+
+# =============================================================================
+# SERIALIZATION
+# =============================================================================
+def _number(value):
+    """JSON-safe float: NaN (e.g. thresholds of an empty scope) becomes null."""
+    value = float(value)
+    return None if value != value else value
+
+
+def _records(frame, columns=None):
+    """Rows as a list of dicts; NaN becomes null."""
+    if columns is not None:
+        frame = frame[columns]
+    return json.loads(frame.to_json(orient='records'))
+
+
+def _scope_body(year_min, year_max, state):
+    return {'year_min': year_min, 'year_max': year_max, 'state': state or ALL_STATES}
+
+
+def _threshold_body(table, percentile):
+    chronic, acute = table.thresholds(percentile)
+    return {
+        'percentile': percentile,
+        'chronic_threshold': _number(chronic),
+        'acute_threshold': _number(acute),
+        'category_counts': table.category_counts(percentile),
+    }
+
+
+# =============================================================================
+# ENDPOINTS
+# =============================================================================
+def health(params):
+    return {'status': 'ok', 'dataset_version': dataset_version()}
+
+
+def ready(params):
+    if not is_ready():
+        raise ApiError(503, "Warming up")
+    body = {'status': 'ready', 'dataset_version': dataset_version()}
+    if warm_up_failure():
+        body['warm_up_failed'] = warm_up_failure()
+    return body
+
+
+def caches(params):
+    return cache_report(entries=params['entries'])
+
+
+def meta(params):
+    return {
+        'dataset_version': dataset_version(),
+        'methodology_version': METHODOLOGY_VERSION,
+        'years': [int(year) for year in get_year_cube().years],
+        'states': sorted(get_rank_index().counties_by_state),
+        'endpoints': [f'/api{path}' for path in ROUTES if path != '/'],
+    }
+
+
+def stats(params):
+    year_min, year_max, state = _scope(params)
+    frame = get_engine().county_stats(year_min, year_max, state)
+    return {**_scope_body(year_min, year_max, state), 'count': len(frame), 'counties': _records(frame)}
+
+
+def classification(params):
+    year_min, year_max, state = _scope(params)
+    percentile = _percentile(params)
+    category = _category(params)
+
+    frame, _, _ = get_engine().double_jeopardy(year_min, year_max, state, percentile)
+    if category is not None:
+        frame = frame[frame['Risk_Category'] == category]
+    return {
+        **_scope_body(year_min, year_max, state),
+        **_threshold_body(get_threshold_table(year_min, year_max, state), percentile),
+        'count': len(frame),
+        'counties': _records(frame, CLASSIFICATION_COLUMNS),
+    }
+
+
+def severity(params):
+    year_min, year_max, state = _scope(params)
+    n = _int_param(params, 'n', DEFAULT_TOP_N, 1, MAX_TOP_N)
+    frame = get_engine().top_n('severity_score', n, year_min, year_max, state)
+    return {**_scope_body(year_min, year_max, state), 'n': n, 'counties': _records(frame, SEVERITY_COLUMNS)}
+
+
+def thresholds(params):
+    year_min, year_max, state = _scope(params)
+    table = get_threshold_table(year_min, year_max, state)
+    return {**_scope_body(year_min, year_max, state), 'counties': table.size,
+            **_threshold_body(table, _percentile(params))}
+
+
+def drilldown(params):
+    """One county against the national thresholds and ranks (as on the Drilldown page)."""
+    year_min, year_max, state = _scope(params)
+    county = params['county']
+    county_id = _county(params, state, year_min, year_max)
+    percentile = _percentile(params)
+
+    national = get_engine().county_stats(year_min, year_max)
+    row = national[national['county_id'] == county_id]
+    chronic, acute = float(row['mean_median_aqi'].iloc[0]), float(row['mean_max_aqi'].iloc[0])
+
+    table = get_threshold_table(year_min, year_max)
+    chronic_threshold, acute_threshold = table.thresholds(percentile)
+    code = int(classify_risk(chronic, acute, chronic_threshold, acute_threshold))
+
+    yearly = get_rank_index().county_rows(county_id)
+    yearly = yearly[(yearly['Year'] >= year_min) & (yearly['Year'] <= year_max)]
+    return {
+        **_scope_body(year_min, year_max, state),
+        'county': county,
+        'county_id': int(county_id),
+        'mean_median_aqi': chronic,
+        'mean_max_aqi': acute,
+        'chronic_rank': table.count_at_or_above('mean_median_aqi', chronic),
+        'acute_rank': table.count_at_or_above('mean_max_aqi', acute),
+        'total_counties': table.size,
+        'percentile': percentile,
+        'chronic_threshold': _number(chronic_threshold),
+        'acute_threshold': _number(acute_threshold),
+        'risk_category': RISK_LABELS[code],
+        'yearly': _records(yearly.drop(columns='county_id', errors='ignore')),
+    }
+
+
+# Endpoints whose responses must always reach the server
+UNCACHED_ENDPOINTS = {health, ready, caches}
+
+ROUTES = {
+    '/': meta,
+    '/health': health,
+    '/ready': ready,
+    '/cache': caches,
+    '/meta': meta,
+    '/stats': stats,
+    '/classification': classification,
+    '/severity': severity,
+    '/thresholds': thresholds,
+    '/drilldown': drilldown,
+}
+
+
+# =============================================================================
+# WSGI APP
+# =============================================================================
+def _route(path):
+    if path.startswith('/api'):
+        path = path[len('/api'):]
+    return ROUTES.get(path.rstrip('/') or '/')
+
+
+def parse_params(query_string):
+    """Raw query parameters: last value wins, blanks dropped."""
+    params = {}
+    for name, values in parse_qs(query_string).items():
+        value = values[-1].strip()
+        if value:
+            params[name] = value
+    return params
+
+
+class Request:
+    """A routed API request and its cache identity.
+
+    Parameters are validated on construction (raising ApiError). ``key``
+    (endpoint, canonical parameters, dataset and methodology versions)
+    fully determines the response body, so ``etag`` is known without
+    running the endpoint.
+    """
+
+    def __init__(self, path, query_string=''):
+        self.endpoint = _route(path)
+        if self.endpoint is None:
+            raise ApiError(404, f"Unknown endpoint: {path}")
+        self.params = canonical_params(self.endpoint.__name__, parse_params(query_string))
+        self.key = (self.endpoint.__name__, tuple(sorted(self.params.items())),
+                    dataset_version(), METHODOLOGY_VERSION)
+
+    @property
+    def etag(self):
+        return '"' + hashlib.sha256(repr(self.key).encode()).hexdigest()[:32] + '"'
+
+    @property
+    def cache_control(self):
+        return NO_STORE if self.endpoint in UNCACHED_ENDPOINTS else CACHE_CONTROL
+
+    def matches(self, if_none_match):
+        """True when an ``If-None-Match`` header names this response (weak comparison)."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+    def body(self):
+        """Serialized JSON, cached per ``key``."""
+        return _responses.get_or_compute(
+            self.key, lambda: json.dumps(self.endpoint(self.params), separators=(',', ':')).encode('utf-8')
+        )
+
+
+def response_body(path, query_string=''):
+    return Request(path, query_string).body()
+
+
+def app(environ, start_response):
+    # Under a WSGI server (Vercel, gunicorn) the first request starts warm-up
+    warm_up_in_background()
+    method = environ.get('REQUEST_METHOD', 'GET')
+    headers = [('Content-Type', 'application/json; charset=utf-8')]
+    try:
+        if method not in ('GET', 'HEAD'):
+            raise ApiError(405, f"Method {method} not allowed")
+        # Invalid parameters or a missing county fail here, before any
+        # conditional is considered
+        request = Request(environ.get('PATH_INFO') or '/', environ.get('QUERY_STRING', ''))
+        headers.append(('Cache-Control', request.cache_control))
+        cacheable = request.cache_control != NO_STORE
+        if cacheable:
+            headers.append(('ETag', request.etag))
+        if cacheable and request.matches(environ.get('HTTP_IF_NONE_MATCH')):
+            # The client's copy is current: no computation, no serialization
+            status, body = HTTPStatus.NOT_MODIFIED, b''
+        else:
+            status, body = HTTPStatus.OK, request.body()
+    except ApiError as error:
+        status = error.status
+        body = json.dumps({'error': error.message}).encode('utf-8')
+        headers = [headers[0], ('Cache-Control', NO_STORE)]
+
+    if status == HTTPStatus.NOT_MODIFIED:
+        headers = [header for header in headers if header[0] != 'Content-Type']
+    else:
+        headers.append(('Content-Length', str(len(body))))
+    if status == HTTPStatus.METHOD_NOT_ALLOWED:
+        headers.append(('Allow', 'GET, HEAD'))
+    elif status == HTTPStatus.SERVICE_UNAVAILABLE:
+        headers.append(('Retry-After', '5'))
+    start_response(f'{status.value} {status.phrase}', headers)
+    return [b''] if method == 'HEAD' else [body]
+
+
+def api_cache_info():
+    """Hit/miss counts, hit rate, entry count and bytes of the response cache."""
+    return _responses.info()
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 8000))
+    warm_up_in_background()
+    with make_server('', port, app, server_class=ThreadingWSGIServer) as server:
+        print(f"AirRisk API on http://localhost:{port}/api/meta")
+        server.serve_forever()
@@ -0,0 +1,130 @@
+"""
+Headless command line for the AirRisk pipeline
+Runs the same engine as the dashboard (combine years -> county stats ->
+Double Jeopardy thresholds -> severity scores -> ranks -> exports) without
+importing Streamlit, for nightly jobs and CI.
+
+    python airrisk_cli.py compute --years 2021-2025 --percentile 90 --out dir/
+    python airrisk_cli.py compute --state California --format parquet --bundle --out dir/
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from data import available_years, dataset_version
+from engine import get_engine
+from exports import (
+    BUNDLE,
+    EXPORT_FILE_NAMES,
+    EXPORTS,
+    FORMATS,
+    METHODOLOGY_VERSION,
+    available_formats,
+    export_file_name,
+    write_bundle,
+    write_export,
+)
+
+SUMMARY_FILE = 'summary.json'
+
+
+def parse_years(value):
+    """``'2021-2025'`` or ``'2023'`` -> ``(year_min, year_max)``."""
+    try:
+        first, _, last = value.partition('-')
+        year_min, year_max = int(first), int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YEAR or YEAR-YEAR, got {value!r}") from None
+    if year_min > year_max:
+        raise argparse.ArgumentTypeError(f"empty year range {value!r}")
+    return year_min, year_max
+
+
+def compute(args):
+    """Write every export (and a JSON summary) for one scope to ``args.out``."""
+    years = available_years()
+    if not years:
+        sys.exit("airrisk: no annual_aqi_by_county_YYYY.csv files found")
+    year_min, year_max = args.years or (years[0], years[-1])
+    if year_min < years[0] or year_max > years[-1]:
+        sys.exit(f"airrisk: --years must lie within {years[0]}-{years[-1]}")
+
+    start = time.perf_counter()
+    full_stats, chronic_threshold, acute_threshold = get_engine().exports(
+        year_min, year_max, args.state, args.percentile
+    )
+    if full_stats.empty:
+        sys.exit(f"airrisk: no counties in scope ({args.state or 'All States'}, {year_min}-{year_max})")
+    frames = {name: make(full_stats) for name, make in EXPORTS.items()}
+
+    os.makedirs(args.out, exist_ok=True)
+    written = []
+    for fmt in args.formats:
+        for name, frame in frames.items():
+            path = os.path.join(args.out, export_file_name(name, fmt))
+            with open(path, 'wb') as fh:
+                write_export(frame, fmt, fh)
+            written.append(path)
+        if args.bundle:
+            path = os.path.join(args.out, export_file_name(BUNDLE, fmt))
+            with open(path, 'wb') as fh:
+                write_bundle({EXPORT_FILE_NAMES[name]: frame for name, frame in frames.items()}, fmt, fh)
+            written.append(path)
+
+    summary = {
+        'dataset_version': dataset_version(),
+        'methodology_version': METHODOLOGY_VERSION,
+        'years': [year_min, year_max],
+        'state': args.state or 'All States',
+        'percentile': args.percentile,
+        'chronic_threshold': chronic_threshold,
+        'acute_threshold': acute_threshold,
+        'counties': len(full_stats),
+        'risk_categories': full_stats['Risk_Category'].value_counts().reindex(
+            full_stats['Risk_Category'].cat.categories, fill_value=0
+        ).astype(int).to_dict(),
+        'files': [os.path.basename(path) for path in written],
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    with open(os.path.join(args.out, SUMMARY_FILE), 'w') as fh:
+        json.dump(summary, fh, indent=2)
+
+    for path in written:
+        print(path)
+    print(f"{len(full_stats)} counties, {summary['risk_categories']['Double Jeopardy']} Double Jeopardy "
+          f"({year_min}-{year_max}, {summary['state']}, p{args.percentile}) in {summary['seconds']:.2f}s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='airrisk', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('compute', help="Run the full pipeline and write all exports")
+    run.add_argument('--years', type=parse_years, help="YEAR or YEAR-YEAR (default: every year found)")
+    run.add_argument('--percentile', type=int, default=90, choices=range(0, 101), metavar='0-100',
+                     help="Double Jeopardy threshold percentile (default: 90)")
+    run.add_argument('--state', help="Limit the analysis to one state (default: all states)")
+    run.add_argument('--format', dest='formats', action='append', choices=list(FORMATS),
+                     help="Output format, repeatable (default: csv)")
+    run.add_argument('--bundle', action='store_true', help="Also write a ZIP of all exports per format")
+    run.add_argument('--out', required=True, help="Output directory (created if missing)")
+    run.set_defaults(func=compute)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'compute':
+        args.formats = args.formats or ['csv']
+        missing = [fmt for fmt in args.formats if fmt not in available_formats()]
+        if missing:
+            parser.error(f"{', '.join(missing)} output needs pyarrow")
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+Precomputed analytics structures for the AQI Dashboard
+Built once per dataset version so widget changes only do array lookups.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedCache, cache_budget, coalesced
+from shared import attach, publish
+from data import CACHE_DIR, load_data, dataset_version, compute_county_stats, county_dimension
+
+# Yearly metrics aggregated by the county statistics
+CUBE_METRICS = {
+    'Median AQI': 'mean_median_aqi',
+    'Max AQI': 'mean_max_aqi',
+}
+
+# Integer percentiles precomputed by ThresholdTable
+PERCENTILES = np.arange(101)
+
+# Name of the year cube published to shared memory
+SHARED_CUBE = 'cube_v1'
+
+# Scopes kept by get_threshold_table (year range x state combinations), and
+# its share of the cache memory budget
+THRESHOLD_CACHE_SIZE = 256
+THRESHOLD_CACHE_BYTES = cache_budget(0.05)
+
+ALL_STATES = 'All States'
+
+# Risk category codes: bit 0 = high chronic, bit 1 = high acute
+LOW_RISK, HIGH_CHRONIC, HIGH_ACUTE, DOUBLE_JEOPARDY = range(4)
+RISK_LABELS = ['Low Risk', 'High Chronic', 'High Acute', 'Double Jeopardy']
+
+
+def classify_risk(chronic, acute, chronic_threshold, acute_threshold):
+    """Vectorised Double Jeopardy classification into int8 risk codes.
+
+    Scalar thresholds give one code per county. Passing arrays of thresholds
+    (one pair per percentile) classifies every level in a single pass and
+    returns a ``(levels, counties)`` array. Codes index into ``RISK_LABELS``.
+    """
+    chronic = np.asarray(chronic, dtype=np.float64)
+    acute = np.asarray(acute, dtype=np.float64)
+    chronic_threshold = np.asarray(chronic_threshold, dtype=np.float64)
+    acute_threshold = np.asarray(acute_threshold, dtype=np.float64)
+    if chronic_threshold.ndim:
+        chronic_threshold = chronic_threshold[:, None]
+        acute_threshold = acute_threshold[:, None]
+    codes = (chronic >= chronic_threshold).astype(np.int8)
+    codes |= (acute >= acute_threshold).astype(np.int8) << 1
+    return codes
+
+
+def risk_labels(codes):
+    """Dictionary-encoded labels for risk codes, for display and export."""
+    return pd.Categorical.from_codes(codes, categories=RISK_LABELS)
+
+
+class YearCube:
+    """County x year prefix sums of the yearly AQI metrics.
+
+    ``sums[metric]`` and ``counts`` have one row per county in the county
+    dimension and one column more than there are years; column ``k`` holds
+    the total over the first ``k`` years. The mean over an inclusive year
+    range is therefore one subtraction per county, with no pandas groupby on
+    the request path.
+    """
+
+    def __init__(self, dimension, years, sums, counts):
+        self.dimension = dimension
+        self.county_ids = dimension.table['county_id'].to_numpy()
+        self.states = dimension.table['State'].astype(str).to_numpy()
+        self.counties = dimension.table['County'].astype(str).to_numpy()
+        self.years = years
+        self.sums = sums
+        self.counts = counts
+
+    @classmethod
+    def from_frame(cls, df, dimension):
+        """Build the cube from the combined yearly frame."""
+        county_codes = dimension.positions(df['county_id'].to_numpy())
+        years = np.unique(df['Year'].to_numpy())
+        year_codes = np.searchsorted(years, df['Year'].to_numpy())
+
+        n_counties, n_years = len(dimension), len(years)
+        flat = county_codes.astype(np.int64) * n_years + year_codes
+        size = n_counties * n_years
+
+        def prefix(values):
+            totals = np.bincount(flat, weights=values, minlength=size)
+            totals = totals.reshape(n_counties, n_years)
+            out = np.zeros((n_counties, n_years + 1))
+            np.cumsum(totals, axis=1, out=out[:, 1:])
+            return out
+
+        sums = {
+            metric: prefix(df[metric].to_numpy(dtype=np.float64))
+            for metric in CUBE_METRICS
+        }
+        counts = prefix(None)
+        return cls(dimension=dimension, years=years, sums=sums, counts=counts)
+
+    def to_arrays(self):
+        """Plain arrays for publishing to shared memory (see shared.py)."""
+        arrays = {'years': self.years, 'counts': self.counts}
+        for i, metric in enumerate(CUBE_METRICS):
+            arrays[f"sums{i}"] = self.sums[metric]
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, dimension):
+        """Cube over published (e.g. memory-mapped) arrays, or None if they
+        do not match ``dimension``."""
+        if arrays['counts'].shape[0] != len(dimension):
+            return None
+        sums = {metric: arrays[f"sums{i}"] for i, metric in enumerate(CUBE_METRICS)}
+        return cls(dimension=dimension, years=arrays['years'], sums=sums, counts=arrays['counts'])
+
+    def _year_slice(self, year_min, year_max):
+        start = np.searchsorted(self.years, year_min, side='left')
+        stop = np.searchsorted(self.years, year_max, side='right')
+        return start, stop
+
+    def present(self, year_min, year_max):
+        """Mask of the counties with data in an inclusive year range."""
+        start, stop = self._year_slice(year_min, year_max)
+        return self.counts[:, stop] - self.counts[:, start] > 0
+
+    def county_stats(self, year_min, year_max):
+        """Per-county mean Median/Max AQI for an inclusive year range.
+
+        Returns the same frame as ``compute_county_stats`` on the rows of that
+        year range: counties without data in the range are omitted.
+        """
+        start, stop = self._year_slice(year_min, year_max)
+        counts = self.counts[:, stop] - self.counts[:, start]
+        present = counts > 0
+
+        columns = {
+            'State': self.states[present],
+            'County': self.counties[present],
+        }
+        for metric, name in CUBE_METRICS.items():
+            totals = self.sums[metric][:, stop] - self.sums[metric][:, start]
+            columns[name] = totals[present] / counts[present]
+        columns['county_id'] = self.county_ids[present]
+        return pd.DataFrame(columns)
+
+
+class ThresholdTable:
+    """Sorted chronic/acute values and percentile thresholds for one scope.
+
+    Thresholds for every integer percentile use the same linear interpolation
+    as ``Series.quantile``, and the High Chronic / High Acute / Double
+    Jeopardy counts per percentile are tabulated up front, so moving the
+    percentile slider is a table lookup instead of a sort plus four masks.
+    """
+
+    def __init__(self, chronic, acute):
+        chronic = np.asarray(chronic, dtype=np.float64)
+        acute = np.asarray(acute, dtype=np.float64)
+        self.size = len(chronic)
+        self.chronic = np.sort(chronic)
+        self.acute = np.sort(acute)
+
+        if self.size:
+            qs = PERCENTILES / 100
+            self.chronic_thresholds = np.quantile(self.chronic, qs)
+            self.acute_thresholds = np.quantile(self.acute, qs)
+            self.high_chronic = self.size - np.searchsorted(self.chronic, self.chronic_thresholds, side='left')
+            self.high_acute = self.size - np.searchsorted(self.acute, self.acute_thresholds, side='left')
+            codes = classify_risk(chronic, acute, self.chronic_thresholds, self.acute_thresholds)
+            self.double_jeopardy = (codes == DOUBLE_JEOPARDY).sum(axis=1)
+        else:
+            self.chronic_thresholds = self.acute_thresholds = np.full(len(PERCENTILES), np.nan)
+            self.high_chronic = self.high_acute = self.double_jeopardy = np.zeros(len(PERCENTILES), dtype=int)
+
+    @classmethod
+    def from_county_stats(cls, county_stats):
+        return cls(county_stats['mean_median_aqi'].to_numpy(), county_stats['mean_max_aqi'].to_numpy())
+
+    def thresholds(self, percentile):
+        """Return ``(chronic_threshold, acute_threshold)`` for a percentile."""
+        if float(percentile).is_integer() and 0 <= percentile <= 100:
+            p = int(percentile)
+            return float(self.chronic_thresholds[p]), float(self.acute_thresholds[p])
+        if not self.size:
+            return np.nan, np.nan
+        q = percentile / 100
+        return float(np.quantile(self.chronic, q)), float(np.quantile(self.acute, q))
+
+    def classify(self, county_stats, percentile):
+        """Risk codes for ``county_stats`` rows at one or many percentiles."""
+        percentile = np.asarray(percentile)
+        if percentile.ndim:
+            chronic_threshold = self.chronic_thresholds[percentile]
+            acute_threshold = self.acute_thresholds[percentile]
+        else:
+            chronic_threshold, acute_threshold = self.thresholds(percentile.item())
+        return classify_risk(
+            county_stats['mean_median_aqi'].to_numpy(),
+            county_stats['mean_max_aqi'].to_numpy(),
+            chronic_threshold,
+            acute_threshold,
+        )
+
+    def count_at_or_above(self, metric, value):
+        """Number of counties whose ``metric`` is >= ``value`` (binary search)."""
+        values = self.chronic if metric == 'mean_median_aqi' else self.acute
+        return int(self.size - np.searchsorted(values, value, side='left'))
+
+    def category_counts(self, percentile):
+        """Counties per risk category at an integer percentile."""
+        p = int(percentile)
+        both = int(self.double_jeopardy[p])
+        chronic_only = int(self.high_chronic[p]) - both
+        acute_only = int(self.high_acute[p]) - both
+        return {
+            'Low Risk': self.size - both - chronic_only - acute_only,
+            'High Chronic': chronic_only,
+            'High Acute': acute_only,
+            'Double Jeopardy': both,
+        }
+
+    def double_jeopardy_count(self, percentile):
+        return int(self.double_jeopardy[int(percentile)])
+
+
+class NormalizationTable:
+    """Min/max/mean of the county metrics for every state and the nation.
+
+    ``bounds`` has one row per state code, plus ``NATIONAL`` for the whole
+    country, from a single grouped aggregation over a year range's county
+    stats. ``scale``, ``scope_mean`` and ``scope_rank`` then evaluate a column
+    for every state scope at once: each county is normalized, averaged and
+    ranked within its own state, or within the nation when ``national``.
+    """
+
+    NATIONAL = -1
+    METRICS = ('mean_median_aqi', 'mean_max_aqi')
+
+    def __init__(self, county_stats):
+        self.county_stats = county_stats.reset_index(drop=True)
+        self.size = len(self.county_stats)
+        self.state_codes = self.county_stats['county_id'].to_numpy() // 1000
+
+        keys = np.concatenate([self.state_codes, np.full(self.size, self.NATIONAL)])
+        values = pd.concat([self.county_stats[list(self.METRICS)]] * 2, ignore_index=True)
+        self.bounds = values.groupby(keys).agg(['min', 'max', 'mean'])
+
+    def keys(self, national=False):
+        """Scope key (state code or ``NATIONAL``) of every county row."""
+        return np.full(self.size, self.NATIONAL) if national else self.state_codes
+
+    def scale(self, metric, flat=np.nan, national=False):
+        """Min-max normalize ``metric`` within each county's scope.
+
+        Scopes whose values are all equal get ``flat``.
+        """
+        keys = self.keys(national)
+        low = self.bounds[(metric, 'min')].reindex(keys).to_numpy()
+        high = self.bounds[(metric, 'max')].reindex(keys).to_numpy()
+        values = self.county_stats[metric].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled = (values - low) / (high - low)
+        return np.where(high != low, scaled, flat)
+
+    def scope_mean(self, values, national=False):
+        """Mean of a per-county column within each scope, indexed by scope key."""
+        return pd.Series(values).groupby(self.keys(national)).mean()
+
+    def scope_rank(self, values, national=False):
+        """Descending rank of a per-county column within each county's scope.
+
+        Missing values (e.g. the Severity Score of a one-county state) rank
+        last so every scope gets integer ranks.
+        """
+        ranks = pd.Series(values).groupby(self.keys(national)).rank(ascending=False, na_option='bottom')
+        return ranks.to_numpy()
+
+
+class RankIndex:
+    """County lookup, rank and ECDF index over the full-range county stats.
+
+    Holds the county stats keyed by ``county_id``, each county's rank (number
+    of counties at or above its value, as the Drilldown page shows) for both
+    metrics, sorted metric arrays for ECDF queries, and the yearly frame's
+    row order by county with per-county offsets into it, so a drilldown
+    never scans the full table.
+    """
+
+    METRICS = ('mean_median_aqi', 'mean_max_aqi')
+
+    def __init__(self, county_stats, yearly, dimension):
+        self.dimension = dimension
+        self.county_stats = county_stats.reset_index(drop=True)
+        self.size = len(self.county_stats)
+        ids = self.county_stats['county_id'].to_numpy()
+        self._positions = np.full(len(dimension), -1, dtype=np.int32)
+        self._positions[dimension.positions(ids)] = np.arange(self.size, dtype=np.int32)
+
+        self.sorted_values = {}
+        self.ranks = {}
+        for metric in self.METRICS:
+            values = self.county_stats[metric].to_numpy()
+            self.sorted_values[metric] = np.sort(values)
+            self.ranks[metric] = self.size - np.searchsorted(self.sorted_values[metric], values, side='left')
+
+        self.counties_by_state = {
+            state: dict(zip(group['County'], group['county_id']))
+            for state, group in self.county_stats.groupby('State')
+        }
+
+        # Row offsets: yearly rows grouped by county position, years kept in
+        # order. Only the row order is stored; the (shared) yearly frame is
+        # not copied.
+        row_positions = self._positions[dimension.positions(yearly['county_id'].to_numpy())]
+        self.yearly = yearly
+        self.row_order = np.argsort(row_positions, kind='stable')
+        self.offsets = np.searchsorted(row_positions[self.row_order], np.arange(self.size + 1))
+
+    @classmethod
+    def from_frame(cls, df, dimension):
+        return cls(compute_county_stats(df), df, dimension)
+
+    def position(self, county_id):
+        return int(self._positions[self.dimension.positions(county_id)])
+
+    def county(self, county_id):
+        """Aggregated stats row for one county."""
+        return self.county_stats.iloc[self.position(county_id)]
+
+    def rank(self, metric, county_id):
+        """1-based rank where ties share the lowest rank, e.g. ``#1`` is worst."""
+        return int(self.ranks[metric][self.position(county_id)])
+
+    def ecdf(self, metric, value):
+        """Fraction of counties with ``metric`` <= ``value``."""
+        if not self.size:
+            return np.nan
+        return np.searchsorted(self.sorted_values[metric], value, side='right') / self.size
+
+    def county_rows(self, county_id):
+        """Yearly rows for one county, in year order."""
+        i = self.position(county_id)
+        return self.yearly.take(self.row_order[self.offsets[i]:self.offsets[i + 1]])
+
+
+@coalesced
+@lru_cache(maxsize=1)
+def _year_cube(version):
+    dimension = county_dimension()
+    shared = attach(CACHE_DIR, version, SHARED_CUBE)
+    cube = None if shared is None else YearCube.from_arrays(shared[0], dimension)
+    if cube is not None:
+        return cube
+
+    cube = YearCube.from_frame(load_data(), dimension)
+    if publish(CACHE_DIR, version, SHARED_CUBE, cube.to_arrays()):
+        shared = attach(CACHE_DIR, version, SHARED_CUBE)
+        if shared is not None:
+            cube = YearCube.from_arrays(shared[0], dimension) or cube
+    return cube
+
+
+def get_year_cube():
+    """Year cube for the current dataset version.
+
+    Built once per host and memory-mapped by every process (see shared.py).
+    """
+    return _year_cube(dataset_version())
+
+
+def scope_county_stats(year_min=None, year_max=None, state=None):
+    """County stats for a year range, optionally limited to one state."""
+    cube = get_year_cube()
+    if year_min is None:
+        year_min = cube.years[0]
+    if year_max is None:
+        year_max = cube.years[-1]
+    stats = cube.county_stats(year_min, year_max)
+    if state and state != ALL_STATES:
+        code = cube.dimension.state_code(state)
+        stats = stats[stats['county_id'] // 1000 == code].reset_index(drop=True)
+    return stats
+
+
+_thresholds = BoundedCache(THRESHOLD_CACHE_SIZE, THRESHOLD_CACHE_BYTES, name='thresholds')
+
+
+def get_threshold_table(year_min=None, year_max=None, state=None):
+    """Threshold table for a (year range, state) scope, cached per scope.
+
+    ``None`` years mean the full data range and ``None``/``'All States'``
+    means the national scope.
+    """
+    cube = get_year_cube()
+    year_min = int(cube.years[0] if year_min is None else year_min)
+    year_max = int(cube.years[-1] if year_max is None else year_max)
+    if state == ALL_STATES:
+        state = None
+    return _thresholds.get_or_compute(
+        (dataset_version(), year_min, year_max, state),
+        lambda: ThresholdTable.from_county_stats(scope_county_stats(year_min, year_max, state)),
+    )
+
+
+@coalesced
+@lru_cache(maxsize=1)
+def _rank_index(version):
+    return RankIndex.from_frame(load_data(), county_dimension())
+
+
+def get_rank_index():
+    """County rank index for the current dataset version."""
+    return _rank_index(dataset_version())
@@ -12,6 +12,12 @@ import plotly.graph_objects as go
 import os
 import re
 
+from analytics import classify_risk, risk_labels
+
+# Bounds for the st.cache_data caches below (entries per function, seconds)
+CACHE_MAX_ENTRIES = 32
+CACHE_TTL_SECONDS = 6 * 60 * 60
+
 # =============================================================================
 # PAGE CONFIG
 # =============================================================================
@@ -610,7 +616,7 @@ st.markdown("""
 # =============================================================================
 # DATA LOADING - Cached for performance
 # =============================================================================
-@st.cache_data
+@st.cache_data(max_entries=1, ttl=CACHE_TTL_SECONDS)
 def load_data():
     """Load and combine all AQI datasets - EXACT as in original notebook."""
     # Get the parent directory where CSV files are located
@@ -641,28 +647,28 @@ def load_data():
     df = pd.concat(df_list, ignore_index=True)
     return df
 
-@st.cache_data
-def compute_county_stats(_df):
+# Arguments are hashed by content (no leading underscore) so different frames
+# never share a cache entry
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+def compute_county_stats(df):
     """Compute aggregated county statistics - EXACT as in original notebook."""
-    county_stats = _df.groupby(['State', 'County']).agg({
+    county_stats = df.groupby(['State', 'County']).agg({
         'Median AQI': 'mean',
         'Max AQI': 'mean'
     }).reset_index()
     county_stats.columns = ['State', 'County', 'mean_median_aqi', 'mean_max_aqi']
     return county_stats
 
-@st.cache_data
-def compute_double_jeopardy(_county_stats, percentile=90):
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+def compute_double_jeopardy(county_stats, percentile=90):
     """Identify Double Jeopardy counties - EXACT logic from notebook."""
-    median_threshold = _county_stats['mean_median_aqi'].quantile(percentile / 100)
-    max_threshold = _county_stats['mean_max_aqi'].quantile(percentile / 100)
-    
-    stats = _county_stats.copy()
-    stats['Risk_Category'] = 'Low Risk'
-    stats.loc[(stats['mean_median_aqi'] >= median_threshold), 'Risk_Category'] = 'High Chronic'
-    stats.loc[(stats['mean_max_aqi'] >= max_threshold), 'Risk_Category'] = 'High Acute'
-    stats.loc[(stats['mean_median_aqi'] >= median_threshold) & 
-              (stats['mean_max_aqi'] >= max_threshold), 'Risk_Category'] = 'Double Jeopardy'
+    median_threshold = county_stats['mean_median_aqi'].quantile(percentile / 100)
+    max_threshold = county_stats['mean_max_aqi'].quantile(percentile / 100)
+    
+    stats = county_stats.copy()
+    stats['Risk_Category'] = risk_labels(classify_risk(
+        stats['mean_median_aqi'], stats['mean_max_aqi'], median_threshold, max_threshold
+    ))
     
     return stats, median_threshold, max_threshold
 
@@ -0,0 +1,174 @@
+"""
+Content-addressed artifact store for the AQI Dashboard pipeline
+Each pipeline stage's output (a frame plus JSON metadata) is saved under a
+hash of the stage name, the hashes of its input artifacts and its
+parameters. A result is recomputed only when something it depends on
+changes, and computed results survive restarts.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from cache import content_key
+
+try:
+    from pyarrow import ArrowException
+except ImportError:
+    ArrowException = OSError
+
+# Failures that make saving an artifact a no-op: unwritable store, or a
+# frame Parquet cannot hold (e.g. mixed-type object columns) or a
+# non-JSON metadata value
+SAVE_ERRORS = (OSError, ValueError, TypeError, ArrowException)
+
+# Bumped whenever stage outputs change shape or meaning
+ARTIFACT_FORMAT = 1
+
+# Artifacts kept on disk; the least recently used are pruned beyond this
+MAX_ARTIFACTS = 4096
+
+MANIFEST_SUFFIX = '.json'
+FRAME_SUFFIX = '.parquet'
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """One stage output: ``frame``, JSON-serializable ``meta`` and its digest."""
+    stage: str
+    digest: str
+    frame: pd.DataFrame
+    meta: dict = field(default_factory=dict)
+    inputs: tuple = ()
+
+
+def artifact_key(stage, inputs=(), params=None):
+    """Digest of a stage run: stage name, input digests and parameters."""
+    return content_key(ARTIFACT_FORMAT, stage, list(inputs), params or {})
+
+
+class ArtifactStore:
+    """Disk store of stage outputs, addressed by ``artifact_key``.
+
+    ``get_or_compute(stage, inputs, params, compute)`` loads the artifact
+    for that key or runs ``compute()`` (returning ``(frame, meta)``) and
+    saves it: the frame as Parquet, then a JSON manifest recording the
+    stage, inputs, parameters and metadata. The manifest is written last,
+    so a crash never leaves a half-written artifact visible. Without
+    pyarrow, or on a read-only filesystem, results are computed but not
+    persisted.
+    """
+
+    def __init__(self, root, enabled=True, max_artifacts=MAX_ARTIFACTS):
+        self.root = root
+        self.enabled = enabled
+        self.max_artifacts = max_artifacts
+        self._lock = threading.Lock()
+        self.loaded = 0
+        self.computed = 0
+        self.saved = 0
+
+    def _paths(self, digest):
+        base = os.path.join(self.root, digest)
+        return base + FRAME_SUFFIX, base + MANIFEST_SUFFIX
+
+    def get_or_compute(self, stage, inputs, params, compute):
+        inputs = tuple(inputs)
+        digest = artifact_key(stage, inputs, params)
+        artifact = self._load(stage, digest, inputs)
+        if artifact is not None:
+            return artifact
+
+        frame, meta = compute()
+        artifact = Artifact(stage, digest, frame, meta, inputs)
+        with self._lock:
+            self.computed += 1
+        self._save(artifact, params)
+        return artifact
+
+    def _load(self, stage, digest, inputs):
+        if not self.enabled:
+            return None
+        frame_path, manifest_path = self._paths(digest)
+        try:
+            with open(manifest_path) as fh:
+                manifest = json.load(fh)
+            frame = pd.read_parquet(frame_path)
+        except Exception:
+            # Missing, truncated or incompatible artifacts are recomputed
+            return None
+        try:
+            # Recency for pruning
+            os.utime(manifest_path)
+        except OSError:
+            # Read-only or shared stores still serve their artifacts
+            pass
+        with self._lock:
+            self.loaded += 1
+        return Artifact(stage, digest, frame, manifest['meta'], inputs)
+
+    def _save(self, artifact, params):
+        if not self.enabled:
+            return
+        frame_path, manifest_path = self._paths(artifact.digest)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        manifest = {
+            'stage': artifact.stage,
+            'digest': artifact.digest,
+            'inputs': list(artifact.inputs),
+            'params': params or {},
+            'meta': artifact.meta,
+            'rows': len(artifact.frame),
+            'created': time.time(),
+        }
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            artifact.frame.to_parquet(frame_path + suffix, index=False)
+            os.replace(frame_path + suffix, frame_path)
+            with open(manifest_path + suffix, 'w') as fh:
+                json.dump(manifest, fh)
+            os.replace(manifest_path + suffix, manifest_path)
+        except SAVE_ERRORS:
+            # Persisting is best-effort: the computed artifact is returned
+            # either way, it is just recomputed after a restart
+            _remove(frame_path + suffix, manifest_path + suffix)
+            return
+        with self._lock:
+            self.saved += 1
+        self._prune()
+
+    def _prune(self):
+        try:
+            manifests = [entry for entry in os.scandir(self.root) if entry.name.endswith(MANIFEST_SUFFIX)]
+            if len(manifests) <= self.max_artifacts:
+                return
+            manifests.sort(key=lambda entry: entry.stat().st_mtime)
+        except OSError:
+            return
+        for entry in manifests[:len(manifests) - self.max_artifacts]:
+            _remove(entry.path, entry.path[:-len(MANIFEST_SUFFIX)] + FRAME_SUFFIX)
+
+    def manifest(self, digest):
+        """Stored manifest (stage, inputs, params, meta) of an artifact, or None."""
+        try:
+            with open(self._paths(digest)[1]) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def info(self):
+        with self._lock:
+            return {'loaded': self.loaded, 'computed': self.computed, 'saved': self.saved,
+                    'enabled': self.enabled, 'root': self.root}
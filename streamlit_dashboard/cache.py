@@ -0,0 +1,331 @@
+"""
+In-process result caches for the AQI Dashboard
+Bounded by entry count and by bytes, thread-safe and observable, shared by
+every session in the process. Concurrent misses on the same key are
+coalesced into a single computation.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Memory budget (MiB) shared by all process-wide result caches; each cache
+# takes a fixed share of it. Set AIRRISK_CACHE_MB to fit the dyno's limit.
+# The dataset itself is outside it: the loaded frame, its parsed year files
+# (data._parsed_files), the year cube and the rank index are held once per
+# dataset version for as long as it is current, and cannot be evicted.
+CACHE_BUDGET_MB = float(os.environ.get('AIRRISK_CACHE_MB', 512))
+
+EVICTION_POLICIES = ('lru', 'lfu')
+
+# name -> cache, for cache_report()
+_caches = {}
+
+
+def cache_budget(share):
+    """Bytes of the ``CACHE_BUDGET_MB`` budget granted to a cache."""
+    return int(CACHE_BUDGET_MB * share * 2 ** 20)
+
+
+def estimate_size(value, _seen=None):
+    """Approximate memory held by a cached value, in bytes.
+
+    Objects are measured through their attributes (e.g. the frames inside a
+    NormalizationTable); objects reached twice are counted once.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item, _seen) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item, _seen) for item in value.values())
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_size(vars(value), _seen)
+    return sys.getsizeof(value)
+
+
+def _update_digest(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr((list(value.columns), list(value.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(repr((value.name, str(value.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def content_key(*parts):
+    """Content hash of frames, arrays and JSON-serializable values.
+
+    Use it instead of object identity (or Streamlit's unhashed ``_`` args)
+    whenever a cache key depends on data: equal contents give equal keys.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        _update_digest(digest, part)
+    return digest.hexdigest()
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent computations of the same key.
+
+    The first caller of ``do(key, compute)`` runs ``compute()``; callers that
+    arrive while it is in flight wait for it and get its result (or its
+    exception) instead of computing again. Nothing is kept once the call
+    finishes, so this only collapses bursts: pair it with a cache.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, compute):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def info(self):
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+
+
+def coalesced(func):
+    """Decorator over an ``@lru_cache`` function so that concurrent callers
+    with the same arguments wait on one call instead of each computing it
+    (``functools.lru_cache`` computes every concurrent miss)."""
+    flight = SingleFlight()
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        return flight.do(args, lambda: func(*args))
+
+    wrapper.cache_info = func.cache_info
+    wrapper.cache_clear = func.cache_clear
+    wrapper.flight_info = flight.info
+    return wrapper
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'hits', 'created', 'accessed')
+
+    def __init__(self, value, size):
+        self.value = value
+        self.size = size
+        self.hits = 0
+        self.created = self.accessed = time.monotonic()
+
+
+class BoundedCache:
+    """Result cache bounded by entry count and, optionally, by bytes.
+
+    ``get_or_compute(key, compute)`` returns the cached value for ``key`` or
+    stores ``compute()``'s result. Once ``maxsize`` entries or ``max_bytes``
+    estimated bytes are exceeded, entries are evicted by ``policy``: ``'lru'``
+    drops the least recently used, ``'lfu'`` the least often hit (least
+    recently used among ties, never the entry just stored). LFU hit counts
+    are halved every ``maxsize`` lookups, so entries that were popular once
+    (e.g. responses for a previous dataset version) age out instead of
+    outranking current ones forever. A value larger
+    than the whole budget is returned without being cached. Concurrent
+    misses on one key run ``compute`` once; the other callers wait for its
+    result.
+
+    ``info()`` reports hits, misses, coalesced misses, hit rate, evictions
+    and bytes held; ``entries_info()`` reports size and hits per entry.
+    """
+
+    def __init__(self, maxsize=128, max_bytes=None, policy='lru', name=None):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy!r}")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._flight = SingleFlight()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+        self.agings = 0
+        self._lookups_since_aging = 0
+        if name is not None:
+            _caches[name] = self
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if self.policy == 'lfu':
+                self._age()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                entry.accessed = time.monotonic()
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+
+        def compute_and_store():
+            value = compute()
+            self._store(key, value)
+            return value
+
+        return self._flight.do(key, compute_and_store)
+
+    def _store(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.rejected += 1
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size
+            self._entries[key] = _Entry(value, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                self._evict(protect=key)
+
+    def _age(self):
+        # Amortized O(1): one pass over at most maxsize entries per maxsize lookups
+        self._lookups_since_aging += 1
+        if self._lookups_since_aging < self.maxsize:
+            return
+        self._lookups_since_aging = 0
+        self.agings += 1
+        for entry in self._entries.values():
+            entry.hits >>= 1
+
+    def _evict(self, protect):
+        if self.policy == 'lfu':
+            # OrderedDict order is least to most recently used, and min()
+            # keeps the first of equal counts
+            victim = min(
+                (k for k in self._entries if k != protect),
+                key=lambda k: self._entries[k].hits,
+            )
+        else:
+            victim = next(iter(self._entries))
+        self.bytes -= self._entries.pop(victim).size
+        self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.rejected = 0
+            self.agings = 0
+            self._lookups_since_aging = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def info(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self._flight.coalesced,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'rejected': self.rejected,
+                'agings': self.agings,
+                'policy': self.policy,
+            }
+
+    def entries_info(self):
+        """Per-entry key, estimated bytes, hits (aged, for LFU) and age/idle
+        seconds, largest first."""
+        now = time.monotonic()
+        with self._lock:
+            rows = [{
+                'key': repr(key)[:200],
+                'bytes': entry.size,
+                'hits': entry.hits,
+                'age_s': now - entry.created,
+                'idle_s': now - entry.accessed,
+            } for key, entry in self._entries.items()]
+        return sorted(rows, key=lambda row: row['bytes'], reverse=True)
+
+
+def cache_report(entries=0):
+    """``info()`` of every named cache, plus the total bytes held against the budget.
+
+    With ``entries`` each cache also lists its ``entries`` largest entries
+    (see ``BoundedCache.entries_info``) under ``'largest'``.
+    """
+    report = {name: cache.info() for name, cache in _caches.items()}
+    if entries:
+        for name, cache in _caches.items():
+            report[name]['largest'] = cache.entries_info()[:entries]
+    report['total'] = {
+        'bytes': sum(info['bytes'] for info in report.values()),
+        'budget_bytes': cache_budget(1.0),
+    }
+    return report
@@ -0,0 +1,445 @@
+"""
+Chart builders for the AQI Dashboard
+Each builds one chart's Plotly figure from the data it is drawn from. Pages
+render them through ``figures.cached_figure``, and warmup.py builds the
+default views before the first visitor arrives.
+"""
+
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from data import county_dimension
+from figures import scatter_trace_type, typed_array
+
+
+def build_risk_pie(risk_counts):
+    """Donut chart of counties per risk category."""
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=risk_counts.index,
+        values=risk_counts.values,
+        hole=0.5,
+        marker_colors=['#48bb78', '#ecc94b', '#ed8936', '#c53030'],
+        textinfo='percent+label',
+        textposition='outside'
+    )])
+
+    fig_pie.update_layout(
+        title=dict(text="Risk Category Distribution", font_size=14),
+        showlegend=False,
+        margin=dict(t=60, b=20, l=20, r=20),
+        height=300,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig_pie
+
+
+def build_chronic_chart(chronic_top, top_n):
+    """Horizontal bar chart of the top counties by Mean Median AQI."""
+    fig = px.bar(
+        chronic_top,  # Highest at top
+        x='mean_median_aqi',
+        y='County',
+        color='State',
+        orientation='h',
+        hover_data={
+            'State': True,
+            'mean_median_aqi': ':.1f',
+            'mean_max_aqi': ':.1f'
+        },
+        labels={
+            'mean_median_aqi': 'Average Median AQI (Daily Exposure)',
+            'County': '',
+            'State': 'State'
+        },
+        color_discrete_sequence=px.colors.sequential.Viridis
+    )
+
+    fig.update_layout(
+        height=max(400, top_n * 28),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='white',
+        font=dict(family="Inter, sans-serif", size=12),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            title=""
+        ),
+        margin=dict(l=20, r=20, t=60, b=40),
+        xaxis_title="Average Median AQI (Daily Exposure)",
+        yaxis_title=""
+    )
+
+    fig.update_xaxes(gridcolor='#e2e8f0', zeroline=True, zerolinecolor='#cbd5e0')
+    fig.update_yaxes(gridcolor='#e2e8f0')
+    return fig
+
+
+def build_acute_chart(acute_top, top_n):
+    """Horizontal bar chart of the top counties by Mean Max AQI."""
+    fig = px.bar(
+        acute_top.sort_values('mean_max_aqi_display', ascending=False),
+        x='mean_max_aqi_display',
+        y='County',
+        color='State',
+        orientation='h',
+        hover_data={
+            'State': True,
+            'mean_median_aqi': ':.1f',
+            'mean_max_aqi': ':.1f',
+            'mean_max_aqi_display': False
+        },
+        labels={
+            'mean_max_aqi_display': 'Average Max AQI (Extreme Events)',
+            'County': '',
+            'State': 'State'
+        },
+        color_discrete_sequence=px.colors.sequential.Magma
+    )
+
+    fig.update_layout(
+        height=max(400, top_n * 28),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='white',
+        font=dict(family="Inter, sans-serif", size=12),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            title=""
+        ),
+        margin=dict(l=20, r=20, t=60, b=40),
+        xaxis_title="Average Max AQI (Extreme Events)",
+        yaxis_title=""
+    )
+
+    # Add danger threshold line
+    fig.add_vline(x=150, line_dash="dash", line_color="#c53030", 
+                  annotation_text="Unhealthy (150)", annotation_position="top")
+    fig.add_vline(x=300, line_dash="dash", line_color="#742a2a", 
+                  annotation_text="Hazardous (300)", annotation_position="top")
+
+    fig.update_xaxes(gridcolor='#e2e8f0', zeroline=True, zerolinecolor='#cbd5e0')
+    fig.update_yaxes(gridcolor='#e2e8f0')
+    return fig
+
+
+def with_outlier_display(acute_top, outlier_handling, scope_stats):
+    """Add the charted ``mean_max_aqi_display`` column to ``acute_top``.
+
+    The winsorizing percentile is taken over ``scope_stats``, the whole state
+    scope rather than just the charted counties.
+    """
+    if outlier_handling == "Cap at 500":
+        acute_top['mean_max_aqi_display'] = acute_top['mean_max_aqi'].clip(upper=500)
+    elif outlier_handling == "Winsorize Top 1%":
+        p99 = scope_stats['mean_max_aqi'].quantile(0.99)
+        acute_top['mean_max_aqi_display'] = acute_top['mean_max_aqi'].clip(upper=p99)
+    else:
+        acute_top['mean_max_aqi_display'] = acute_top['mean_max_aqi']
+    return acute_top
+
+
+
+def build_severity_bar(top_counties_sorted, top_n):
+    """Top counties by combined severity, colored by risk category."""
+    # Color by risk category
+    bar_colors = {
+        'Low Risk': '#48bb78',
+        'High Vulnerability': '#ecc94b',
+        'High Hazard': '#ed8936',
+        'Double Jeopardy': '#c53030'
+    }
+
+    fig_bar = px.bar(
+        top_counties_sorted,
+        x='severity_score',
+        y='County',
+        color='risk_category',
+        color_discrete_map=bar_colors,
+        orientation='h',
+        hover_data={
+            'State': True,
+            'vulnerability_score': ':.3f',
+            'hazard_score': ':.3f',
+            'severity_score': ':.3f',
+            'mean_median_aqi': ':.1f',
+            'mean_max_aqi': ':.1f'
+        },
+        labels={
+            'severity_score': 'Combined Severity Score',
+            'County': '',
+            'risk_category': 'Risk Category',
+            'vulnerability_score': 'Vulnerability Score',
+            'hazard_score': 'Hazard Score'
+        },
+        category_orders={'risk_category': ['Double Jeopardy', 'High Hazard', 'High Vulnerability', 'Low Risk']}
+    )
+
+    # Ensure y-axis maintains sorted order
+    fig_bar.update_yaxes(categoryorder='array', categoryarray=top_counties_sorted['County'].tolist())
+
+    fig_bar.update_layout(
+        height=max(400, top_n * 35),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='white',
+        font=dict(family="Inter, sans-serif", size=11),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            title=""
+        ),
+        margin=dict(l=10, r=10, t=40, b=40),
+        xaxis_range=[0, 1]
+    )
+
+    fig_bar.update_xaxes(gridcolor='#e2e8f0', zeroline=True, zerolinecolor='#cbd5e0')
+    fig_bar.update_yaxes(gridcolor='#e2e8f0')
+    return fig_bar
+
+
+def build_profile_scatter(stats_with_scores, mean_vuln, mean_hazard):
+    """Vulnerability vs Hazard quadrant scatter with mean reference lines."""
+    # Create scatter using Plotly Graph Objects for full control
+    fig_scatter = go.Figure()
+
+    # Define colors for risk categories (RdYlGn_r inspired)
+    scatter_colors = {
+        'Low Risk': '#1a9850',
+        'High Vulnerability': '#d9ef8b',
+        'High Hazard': '#fdae61',
+        'Double Jeopardy': '#d73027'
+    }
+
+    # WebGL for large point counts; coordinates go out as binary float32 arrays
+    # and the "County, State" hover labels as customdata
+    trace_type = scatter_trace_type(len(stats_with_scores))
+    categories = stats_with_scores['risk_category'].to_numpy()
+    vulnerability = stats_with_scores['vulnerability_score'].to_numpy()
+    hazard = stats_with_scores['hazard_score'].to_numpy()
+    labels = county_dimension().labels(stats_with_scores['county_id'])
+
+    # Add scatter points by risk category for proper legend ordering
+    for category in ['Low Risk', 'High Vulnerability', 'High Hazard', 'Double Jeopardy']:
+        in_category = categories == category
+        if in_category.any():
+            fig_scatter.add_trace(trace_type(
+                x=typed_array(vulnerability[in_category]),
+                y=typed_array(hazard[in_category]),
+                mode='markers',
+                name=category,
+                marker=dict(
+                    size=10,
+                    color=scatter_colors[category],
+                    line=dict(width=1, color='white'),
+                    opacity=0.8
+                ),
+                customdata=labels[in_category],
+                hovertemplate=(
+                    "<b>%{customdata}</b><br>" +
+                    "Vulnerability Score: %{x:.3f}<br>" +
+                    "Hazard Score: %{y:.3f}<br>" +
+                    "Risk Category: " + category + "<br>" +
+                    "<extra></extra>"
+                )
+            ))
+
+    # Calculate max score for reference lines and quadrant labels
+    max_score = max(
+        stats_with_scores['vulnerability_score'].max(),
+        stats_with_scores['hazard_score'].max(),
+        1.0
+    )
+
+    # Add diagonal reference line (y = x)
+    fig_scatter.add_trace(go.Scatter(
+        x=[0, max_score],
+        y=[0, max_score],
+        mode='lines',
+        line=dict(dash='dash', color='gray', width=1.5),
+        name='y = x',
+        opacity=0.5,
+        showlegend=False
+    ))
+
+    # Add horizontal mean reference line
+    fig_scatter.add_hline(
+        y=mean_hazard,
+        line_dash="dot",
+        line_color="gray",
+        line_width=1,
+        opacity=0.5,
+        annotation_text=f"Mean Hazard ({mean_hazard:.2f})",
+        annotation_position="top right",
+        annotation_font_size=9,
+        annotation_font_color="gray"
+    )
+
+    # Add vertical mean reference line
+    fig_scatter.add_vline(
+        x=mean_vuln,
+        line_dash="dot",
+        line_color="gray",
+        line_width=1,
+        opacity=0.5,
+        annotation_text=f"Mean Vuln ({mean_vuln:.2f})",
+        annotation_position="top right",
+        annotation_font_size=9,
+        annotation_font_color="gray"
+    )
+
+    # Add quadrant labels
+    fig_scatter.add_annotation(x=max_score*0.75, y=max_score*0.85, text="High Vulnerability<br>High Hazard",
+        showarrow=False, font=dict(size=10, color='#666'), opacity=0.7, align='center')
+    fig_scatter.add_annotation(x=max_score*0.25, y=max_score*0.85, text="Low Vulnerability<br>High Hazard",
+        showarrow=False, font=dict(size=10, color='#666'), opacity=0.7, align='center')
+    fig_scatter.add_annotation(x=max_score*0.25, y=max_score*0.15, text="Low Vulnerability<br>Low Hazard",
+        showarrow=False, font=dict(size=10, color='#666'), opacity=0.7, align='center')
+    fig_scatter.add_annotation(x=max_score*0.75, y=max_score*0.15, text="High Vulnerability<br>Low Hazard",
+        showarrow=False, font=dict(size=10, color='#666'), opacity=0.7, align='center')
+
+    fig_scatter.update_layout(
+        title=dict(text="Vulnerability Profile", font=dict(size=14, color='#1e293b'), x=0.5),
+        height=500,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='white',
+        font=dict(family="Inter, sans-serif", size=12),
+        legend=dict(
+            title="Risk Category",
+            orientation="v",
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=1.02,
+            bgcolor='rgba(255,255,255,0.9)',
+            bordercolor='#e2e8f0',
+            borderwidth=1
+        ),
+        xaxis=dict(
+            title="Vulnerability Score",
+            range=[-0.05, max_score + 0.1],
+            gridcolor='#e2e8f0',
+            zeroline=True,
+            zerolinecolor='#cbd5e0'
+        ),
+        yaxis=dict(
+            title="Hazard Score",
+            range=[-0.05, max_score + 0.1],
+            gridcolor='#e2e8f0',
+            zeroline=True,
+            zerolinecolor='#cbd5e0'
+        ),
+        margin=dict(l=60, r=120, t=60, b=60)
+    )
+    return fig_scatter
+
+
+def build_severity_chart(severity_top, top_n):
+    """Horizontal bar chart of the top counties by Severity Score."""
+    fig = px.bar(
+        severity_top,
+        x='severity_score',
+        y='County',
+        color='State',
+        orientation='h',
+        hover_data={
+            'State': True,
+            'mean_median_aqi': ':.1f',
+            'mean_max_aqi': ':.1f',
+            'norm_median': ':.3f',
+            'norm_max': ':.3f',
+            'severity_score': ':.3f'
+        },
+        labels={
+            'severity_score': 'Severity Score (0-1)',
+            'County': '',
+            'State': 'State',
+            'norm_median': 'Normalized Chronic',
+            'norm_max': 'Normalized Acute'
+        },
+        color_discrete_sequence=px.colors.sequential.Plasma
+    )
+
+    fig.update_layout(
+        height=max(400, top_n * 28),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='white',
+        font=dict(family="Inter, sans-serif", size=12),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            title=""
+        ),
+        margin=dict(l=20, r=20, t=60, b=40),
+        xaxis_title="Severity Score (0 = Best, 1 = Worst)",
+        yaxis_title="",
+        xaxis_range=[0, 1]
+    )
+
+    fig.update_xaxes(gridcolor='#e2e8f0', zeroline=True, zerolinecolor='#cbd5e0')
+    fig.update_yaxes(gridcolor='#e2e8f0')
+    return fig
+
+
+def build_trend_chart(county_yearly, median_threshold, max_threshold, percentile):
+    """Side-by-side yearly Median/Max AQI trends with threshold lines."""
+    fig = make_subplots(rows=1, cols=2, subplot_titles=("Median AQI (Daily Exposure)", "Max AQI (Peak Events)"))
+
+    # Median AQI trend
+    fig.add_trace(
+        go.Scatter(
+            x=county_yearly['Year'],
+            y=county_yearly['Median AQI'],
+            mode='lines+markers',
+            name='Median AQI',
+            line=dict(color='#3182ce', width=3),
+            marker=dict(size=10)
+        ),
+        row=1, col=1
+    )
+
+    # Add chronic threshold line
+    fig.add_hline(y=median_threshold, line_dash="dash", line_color="#dd6b20", 
+                  annotation_text=f"{percentile}th %ile Threshold", row=1, col=1)
+
+    # Max AQI trend
+    fig.add_trace(
+        go.Scatter(
+            x=county_yearly['Year'],
+            y=county_yearly['Max AQI'],
+            mode='lines+markers',
+            name='Max AQI',
+            line=dict(color='#c53030', width=3),
+            marker=dict(size=10)
+        ),
+        row=1, col=2
+    )
+
+    # Add acute threshold line
+    fig.add_hline(y=max_threshold, line_dash="dash", line_color="#dd6b20", 
+                  annotation_text=f"{percentile}th %ile Threshold", row=1, col=2)
+
+    fig.update_layout(
+        height=400,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='white',
+        font=dict(family="Inter, sans-serif", size=12),
+        showlegend=False,
+        margin=dict(l=20, r=20, t=60, b=40)
+    )
+
+    fig.update_xaxes(gridcolor='#e2e8f0', dtick=1)
+    fig.update_yaxes(gridcolor='#e2e8f0')
+    return fig
@@ -0,0 +1,471 @@
+"""
+Shared data access for the AQI Dashboard
+All pages should load the combined AQI frame through this module so that each
+server process parses the CSV files once and holds a single copy of the data.
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from artifacts import ArtifactStore
+from cache import SingleFlight, coalesced, content_key
+from shared import attach_frame, publish_frame
+
+try:
+    import pyarrow  # noqa: F401  (enables the Parquet cache)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DASHBOARD_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# CSV files live in the repository root, one level above the dashboard
+DATA_DIR = os.path.dirname(DASHBOARD_DIR)
+
+# Directories searched for year files, in priority order. A year found in an
+# earlier directory shadows the same year in a later one.
+DATA_DIRS = [DATA_DIR, DASHBOARD_DIR]
+
+DATA_FILE_PATTERN = re.compile(r'^annual_aqi_by_county_(\d{4})\.csv$')
+
+# Upper bound on concurrent CSV parses when ingesting many years at once
+MAX_PARSE_WORKERS = 8
+
+# Columnar copy of the combined frame, written next to the CSVs on first ingest
+CACHE_DIR = os.path.join(DATA_DIR, ".airrisk_cache")
+
+# Bumped whenever the cached frame's columns or types change
+CACHE_FORMAT = 3
+
+# Content-addressed outputs of the pipeline stages (see artifacts.py)
+ARTIFACT_DIR = os.path.join(CACHE_DIR, "artifacts")
+
+# Name of the combined frame published to shared memory (see shared.py)
+SHARED_FRAME = f"aqi_v{CACHE_FORMAT}"
+
+# Explicit column types for the EPA annual files. AQI values and day counts
+# all fit comfortably in int16 (days <= 366, Max AQI tops out in the low
+# thousands), which keeps the frame a fraction of the inferred int64 size.
+KEY_COLUMNS = ['State', 'County']
+INT16_COLUMNS = [
+    'Year', 'Days with AQI', 'Good Days', 'Moderate Days',
+    'Unhealthy for Sensitive Groups Days', 'Unhealthy Days',
+    'Very Unhealthy Days', 'Hazardous Days', 'Max AQI',
+    '90th Percentile AQI', 'Median AQI', 'Days CO', 'Days NO2',
+    'Days Ozone', 'Days PM2.5', 'Days PM10',
+]
+CSV_DTYPES = {**{col: str for col in KEY_COLUMNS}, **{col: 'int16' for col in INT16_COLUMNS}}
+
+# EPA AQS state codes, which match state FIPS codes (80 is EPA's code for
+# monitors across the Mexican border). County ids are the county's 5-digit
+# FIPS code (``state_code * 1000 + county code``), so ``county_id // 1000``
+# is always the state code.
+STATE_CODES = {
+    'Alabama': 1, 'Alaska': 2, 'Arizona': 4, 'Arkansas': 5, 'California': 6,
+    'Colorado': 8, 'Connecticut': 9, 'Delaware': 10, 'District Of Columbia': 11,
+    'Florida': 12, 'Georgia': 13, 'Hawaii': 15, 'Idaho': 16, 'Illinois': 17,
+    'Indiana': 18, 'Iowa': 19, 'Kansas': 20, 'Kentucky': 21, 'Louisiana': 22,
+    'Maine': 23, 'Maryland': 24, 'Massachusetts': 25, 'Michigan': 26,
+    'Minnesota': 27, 'Mississippi': 28, 'Missouri': 29, 'Montana': 30,
+    'Nebraska': 31, 'Nevada': 32, 'New Hampshire': 33, 'New Jersey': 34,
+    'New Mexico': 35, 'New York': 36, 'North Carolina': 37, 'North Dakota': 38,
+    'Ohio': 39, 'Oklahoma': 40, 'Oregon': 41, 'Pennsylvania': 42,
+    'Rhode Island': 44, 'South Carolina': 45, 'South Dakota': 46,
+    'Tennessee': 47, 'Texas': 48, 'Utah': 49, 'Vermont': 50, 'Virginia': 51,
+    'Washington': 53, 'West Virginia': 54, 'Wisconsin': 55, 'Wyoming': 56,
+    'Puerto Rico': 72, 'Virgin Islands': 78, 'Country Of Mexico': 80,
+}
+
+# Codes handed to states missing from STATE_CODES, in name order
+UNKNOWN_STATE_CODE_START = 100
+
+# Census 2020 county FIPS codes (statefp, countyfp, name)
+COUNTY_FIPS_FILE = os.path.join(DASHBOARD_DIR, "county_fips.csv")
+
+# EPA county names that do not normalize to their Census name
+COUNTY_FIPS_ALIASES = {
+    ('Missouri', 'Sainte Genevieve'): 29186,
+    ('Puerto Rico', 'Mayagnez'): 72097,
+    ('Virgin Islands', 'St Croix'): 78010,
+    ('Virgin Islands', 'St John'): 78020,
+    ('Virgin Islands', 'St Thomas'): 78030,
+    ('Virginia', 'Charles'): 51036,
+}
+
+# Counties without a FIPS code (e.g. in Mexico) get county codes from here
+# up, in name order within their state; no real county code is this high
+NON_FIPS_COUNTY_START = 901
+
+# Census name suffixes that the EPA files leave out
+_COUNTY_SUFFIXES = re.compile(r"\b(county|parish|borough|census area|city and borough|municipality|municipio)\b")
+
+
+@dataclass(frozen=True)
+class DataFile:
+    """One discovered EPA annual AQI file."""
+    year: int
+    path: str
+    checksum: str
+    rows: int
+
+
+# (path, size, mtime) -> (checksum, rows), so unchanged files are hashed once
+_fingerprints = {}
+
+# Concurrent cold starts hash each new file once
+_fingerprint_flight = SingleFlight()
+
+# checksum -> parsed DataFrame for a single year file
+_parsed_files = {}
+
+artifact_store = ArtifactStore(ARTIFACT_DIR, enabled=HAS_PYARROW)
+
+
+def _fingerprint(path):
+    """Return ``(sha256, row_count)`` for a CSV file, reusing earlier results."""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _fingerprints:
+        _fingerprints[key] = _fingerprint_flight.do(key, lambda: _hash_file(path))
+    return _fingerprints[key]
+
+
+def _hash_file(path):
+    with open(path, 'rb') as fh:
+        content = fh.read()
+    rows = content.count(b'\n') - 1
+    if content and not content.endswith(b'\n'):
+        rows += 1
+    return hashlib.sha256(content).hexdigest(), max(rows, 0)
+
+
+def build_manifest():
+    """Discover every ``annual_aqi_by_county_YYYY.csv`` in ``DATA_DIRS``.
+
+    Returns a tuple of ``DataFile`` entries sorted by year.
+    """
+    found = {}
+    for directory in DATA_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            match = DATA_FILE_PATTERN.match(name)
+            if not match:
+                continue
+            year = int(match.group(1))
+            if year in found:
+                continue
+            path = os.path.join(directory, name)
+            checksum, rows = _fingerprint(path)
+            found[year] = DataFile(year=year, path=path, checksum=checksum, rows=rows)
+    return tuple(found[year] for year in sorted(found))
+
+
+def dataset_version(manifest=None):
+    """Short hash identifying the exact set of year files in the manifest."""
+    if manifest is None:
+        manifest = build_manifest()
+    digest = hashlib.sha256()
+    for entry in manifest:
+        digest.update(f"{entry.year}:{entry.checksum};".encode())
+    return digest.hexdigest()[:16]
+
+
+def year_checksums(year_min, year_max, manifest=None):
+    """Checksums of the year files within an inclusive range, in year order."""
+    if manifest is None:
+        manifest = build_manifest()
+    return [entry.checksum for entry in manifest if year_min <= entry.year <= year_max]
+
+
+def available_years(manifest=None):
+    """Sorted list of years present in the manifest."""
+    if manifest is None:
+        manifest = build_manifest()
+    return [entry.year for entry in manifest]
+
+
+def year_bounds(manifest=None):
+    """Return ``(first_year, last_year)`` covered by the data files."""
+    years = available_years(manifest)
+    if not years:
+        return None, None
+    return years[0], years[-1]
+
+
+def year_span_label(manifest=None):
+    """Human readable year span such as ``2021-2025`` for page copy."""
+    first, last = year_bounds(manifest)
+    if first is None:
+        return ""
+    return str(first) if first == last else f"{first}-{last}"
+
+
+def _county_key(name):
+    """Name normalized for matching EPA to Census spellings
+    (``'Saint Louis'`` and ``'St. Louis County'`` -> ``'stlouis'``)."""
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().lower()
+    name = _COUNTY_SUFFIXES.sub('', name)
+    name = re.sub(r"\bsaint\b", 'st', name)
+    return re.sub(r"[^a-z0-9]", '', name)
+
+
+@lru_cache(maxsize=1)
+def _county_fips():
+    """``(state_code, normalized name) -> FIPS`` from ``COUNTY_FIPS_FILE``."""
+    table = pd.read_csv(COUNTY_FIPS_FILE, dtype=str)
+    return {
+        (int(state), _county_key(name)): int(state) * 1000 + int(county)
+        for state, county, name in zip(table['statefp'], table['countyfp'], table['name'])
+    }
+
+
+class CountyDimension:
+    """Interned county table with stable integer ids.
+
+    ``table`` has one row per ``(State, County)`` in name order with columns
+    ``county_id`` (int32), ``state_code`` (int16), ``State``, ``County`` and a
+    ready-made ``label`` ("County, State"). Names are stored once as
+    categoricals; everything else in the app joins and groups on
+    ``county_id`` and only resolves names here when rendering.
+
+    The EPA annual files carry no county FIPS codes, so ids are looked up by
+    name in ``COUNTY_FIPS_FILE`` (plus ``COUNTY_FIPS_ALIASES``) and are the
+    county's FIPS code, stable across dataset versions and safe to join with
+    other county data. Counties with no FIPS code get ids with a county part
+    of ``NON_FIPS_COUNTY_START`` or above, which no real county uses.
+    """
+
+    def __init__(self, table):
+        self.table = table.reset_index(drop=True)
+        ids = self.table['county_id'].to_numpy()
+        self._lookup = np.full(int(ids.max()) + 1 if len(ids) else 1, -1, dtype=np.int32)
+        self._lookup[ids] = np.arange(len(ids), dtype=np.int32)
+        self._ids_by_name = dict(zip(
+            zip(self.table['State'].astype(str), self.table['County'].astype(str)), ids
+        ))
+
+    @classmethod
+    def from_frame(cls, df):
+        pairs = (
+            df[KEY_COLUMNS].astype(str).drop_duplicates()
+            .sort_values(KEY_COLUMNS).reset_index(drop=True)
+        )
+        unknown = sorted(set(pairs['State']) - set(STATE_CODES))
+        codes = {**STATE_CODES, **{
+            state: UNKNOWN_STATE_CODE_START + i for i, state in enumerate(unknown)
+        }}
+        state_code = pairs['State'].map(codes).astype('int16')
+        fips = _county_fips()
+        county_id = pd.Series([
+            COUNTY_FIPS_ALIASES.get((state, county), fips.get((code, _county_key(county)), -1))
+            for state, county, code in zip(pairs['State'], pairs['County'], state_code)
+        ], dtype='int32')
+        missing = county_id < 0
+        ordinal = pairs[missing].groupby('State').cumcount()
+        county_id[missing] = state_code[missing].astype('int32') * 1000 + NON_FIPS_COUNTY_START + ordinal
+        return cls(pd.DataFrame({
+            'county_id': county_id.astype('int32'),
+            'state_code': state_code,
+            'State': pairs['State'].astype('category'),
+            'County': pairs['County'].astype('category'),
+            'label': (pairs['County'] + ', ' + pairs['State']).astype('category'),
+        }))
+
+    def __len__(self):
+        return len(self.table)
+
+    def rows_digest(self, mask):
+        """Content hash of the ids and names of the rows selected by ``mask``.
+
+        Keys artifacts built from a subset of counties (e.g. one year range),
+        so counties added by other years do not invalidate them.
+        """
+        rows = self.table.loc[np.asarray(mask), ['county_id', 'State', 'County']]
+        return content_key(rows.astype({'State': str, 'County': str}).reset_index(drop=True))
+
+    def positions(self, county_ids):
+        """Row positions in ``table`` for an array of county ids."""
+        return self._lookup[np.asarray(county_ids)]
+
+    def county_id(self, state, county):
+        return int(self._ids_by_name[(state, county)])
+
+    def state_code(self, state):
+        match = self.table.loc[self.table['State'] == state, 'state_code']
+        return int(match.iloc[0]) if len(match) else None
+
+    def ids_for_frame(self, df):
+        """County id for every row of a frame with State/County columns."""
+        names = pd.MultiIndex.from_arrays([df[col].astype(str) for col in KEY_COLUMNS])
+        index = pd.MultiIndex.from_arrays([self.table[col].astype(str) for col in KEY_COLUMNS])
+        return self.table['county_id'].to_numpy()[index.get_indexer(names)]
+
+    def labels(self, county_ids):
+        """``"County, State"`` labels for an array of county ids."""
+        return self.table['label'].to_numpy()[self.positions(county_ids)]
+
+
+def _parse_year_file(entry):
+    with open(entry.path, 'rb') as fh:
+        df = pd.read_csv(BytesIO(fh.read()), dtype=CSV_DTYPES)
+    df['Year'] = pd.Series(entry.year, index=df.index, dtype='int16')
+    return df, {}
+
+
+def _read_year_file(entry):
+    """Parse a single year file, cached by content checksum.
+
+    This is the pipeline's 'ingest' stage: the parsed file is stored as an
+    artifact keyed by its checksum, so when a year is added or changed only
+    that file is parsed again, even after a restart.
+    """
+    cached = _parsed_files.get(entry.checksum)
+    if cached is None:
+        cached = artifact_store.get_or_compute(
+            'ingest', [entry.checksum], {'year': entry.year, 'format': CACHE_FORMAT},
+            lambda: _parse_year_file(entry),
+        ).frame
+        _parsed_files[entry.checksum] = cached
+    return cached
+
+
+def cache_path(manifest):
+    """Location of the Parquet cache for a given manifest."""
+    return os.path.join(CACHE_DIR, f"aqi_v{CACHE_FORMAT}_{dataset_version(manifest)}.parquet")
+
+
+def _read_cache(path):
+    if not HAS_PYARROW or not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        # A truncated or incompatible file is simply rebuilt from the CSVs
+        return None
+
+
+def _write_cache(df, path):
+    """Write the Parquet cache atomically and drop caches for old manifests."""
+    if not HAS_PYARROW:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        for name in os.listdir(CACHE_DIR):
+            stale = os.path.join(CACHE_DIR, name)
+            if name.endswith('.parquet') and stale != path:
+                os.remove(stale)
+    except OSError:
+        # Read-only deploys still work, they just parse the CSVs every boot
+        pass
+
+
+def _ingest_csvs(manifest):
+    workers = min(MAX_PARSE_WORKERS, len(manifest))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            df_list = list(pool.map(_read_year_file, manifest))
+    else:
+        df_list = [_read_year_file(entry) for entry in manifest]
+
+    # Drop parsed frames for files that are no longer part of the dataset
+    live = {entry.checksum for entry in manifest}
+    for checksum in list(_parsed_files):
+        if checksum not in live:
+            del _parsed_files[checksum]
+
+    df = pd.concat(df_list, ignore_index=True)
+    for col in KEY_COLUMNS:
+        df[col] = df[col].astype(pd.CategoricalDtype(sorted(df[col].unique())))
+    df['county_id'] = CountyDimension.from_frame(df).ids_for_frame(df)
+    return df
+
+
+@coalesced
+@lru_cache(maxsize=1)
+def _load_manifest(manifest):
+    if not manifest:
+        return pd.DataFrame()
+
+    version = dataset_version(manifest)
+    df = attach_frame(CACHE_DIR, version, SHARED_FRAME)
+    if df is not None:
+        return df
+
+    path = cache_path(manifest)
+    df = _read_cache(path)
+    if df is None:
+        df = _ingest_csvs(manifest)
+        _write_cache(df, path)
+
+    # Serve this process from the shared pages too, dropping the private copy
+    if publish_frame(CACHE_DIR, version, SHARED_FRAME, df):
+        shared = attach_frame(CACHE_DIR, version, SHARED_FRAME)
+        if shared is not None:
+            df = shared
+    return df
+
+
+def load_data():
+    """Load and combine all AQI datasets - EXACT as in original notebook.
+
+    The year files are discovered through ``build_manifest()``. The combined
+    frame is cached at module level per manifest and shared by every page and
+    session in the process; adding or changing a year file produces a new
+    manifest and therefore a fresh frame. Callers must treat it as read-only
+    and take a ``.copy()`` before adding or modifying columns.
+
+    When pyarrow is installed the typed frame (categorical State/County,
+    int16 counts) is persisted to ``CACHE_DIR`` as Parquet, keyed by the
+    manifest checksums, so later cold starts skip CSV parsing entirely.
+
+    The frame is also published as memory-mapped arrays (see shared.py):
+    every worker process on the host attaches the same read-only pages
+    instead of holding its own copy.
+    """
+    return _load_manifest(build_manifest())
+
+
+@coalesced
+@lru_cache(maxsize=1)
+def _county_dimension(version):
+    return CountyDimension.from_frame(load_data())
+
+
+def county_dimension():
+    """County dimension for the current dataset version."""
+    return _county_dimension(dataset_version())
+
+
+def compute_county_stats(df):
+    """Compute aggregated county statistics - EXACT as in original notebook.
+
+    Groups on the integer ``county_id`` and attaches the State/County names
+    from the county dimension afterwards; rows stay in (State, County) order.
+    """
+    grouped = df.groupby('county_id', sort=False).agg({
+        'Median AQI': 'mean',
+        'Max AQI': 'mean'
+    })
+    dim = county_dimension().table
+    rows = dim[dim['county_id'].isin(grouped.index)]
+    grouped = grouped.reindex(rows['county_id'])
+    return pd.DataFrame({
+        'State': rows['State'].astype(str).to_numpy(),
+        'County': rows['County'].astype(str).to_numpy(),
+        'mean_median_aqi': grouped['Median AQI'].to_numpy(),
+        'mean_max_aqi': grouped['Max AQI'].to_numpy(),
+        'county_id': rows['county_id'].to_numpy(),
+    })
@@ -0,0 +1,399 @@
+"""
+Core analytics engine for the AQI Dashboard
+Every page asks the engine for results instead of recomputing them inline.
+Results are memoized in a bounded LRU keyed by the dataset version and the
+normalized query, so widgets that only change presentation (e.g. Top N)
+never trigger a recomputation.
+
+Underneath, the analytics run as a pipeline of stages whose outputs are
+content-addressed artifacts (see artifacts.py) that survive restarts:
+
+    ingest (per year file) -> aggregate (county stats per year range)
+        -> classify (Double Jeopardy at a percentile, per state)
+        -> score (severity / mean-line profile, all scopes)
+        -> export (classification joined with severity)
+
+Each artifact is keyed by the digests of its inputs, so changing only the
+percentile reuses the aggregate and scores, and adding a year file leaves
+the stages of year ranges that do not include it untouched.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from analytics import (
+    ALL_STATES,
+    NormalizationTable,
+    ThresholdTable,
+    get_threshold_table,
+    get_year_cube,
+    risk_labels,
+    scope_county_stats,
+)
+from cache import BoundedCache, cache_budget
+from data import artifact_store, dataset_version, year_checksums
+
+# Result sets kept by the engine across all sessions in the process, and
+# the engine's share of the cache memory budget
+ENGINE_CACHE_SIZE = 256
+ENGINE_CACHE_BYTES = cache_budget(0.45)
+
+# Result set ranked by ``top_n`` for each metric when no ``source`` is given
+TOP_N_SOURCES = {
+    'mean_median_aqi': 'county_stats',
+    'mean_max_aqi': 'county_stats',
+    'severity_score': 'severity',
+    'vulnerability_score': 'vulnerability_profile',
+    'hazard_score': 'vulnerability_profile',
+}
+
+# Severity columns added to the Double Jeopardy table by compute_all_exports
+SEVERITY_COLUMNS = ['norm_median', 'norm_max', 'severity_score', 'Chronic_Rank', 'Acute_Rank', 'Severity_Rank']
+
+# Quadrant labels for the mean-line Vulnerability Profile classification
+# (indexed by risk code: bit 0 = high vulnerability, bit 1 = high hazard)
+PROFILE_LABELS = ['Low Risk', 'High Vulnerability', 'High Hazard', 'Double Jeopardy']
+
+
+@dataclass(frozen=True)
+class Query:
+    """Normalized analytics query; the engine's cache key."""
+    method: str
+    year_min: int
+    year_max: int
+    state: str = None
+    percentile: int = None
+
+
+def normalize_query(method, year_min=None, year_max=None, state=None, percentile=None):
+    """Fill in defaults so equivalent requests share one cache entry."""
+    years = get_year_cube().years
+    year_min = int(years[0] if year_min is None else year_min)
+    year_max = int(years[-1] if year_max is None else year_max)
+    if state == ALL_STATES or not state:
+        state = None
+    if percentile is not None:
+        percentile = int(percentile)
+    return Query(method, year_min, year_max, state, percentile)
+
+
+def descending_order(values):
+    """Positions that sort ``values`` high to low, NaN last.
+
+    Ties come out in the same order as ``sort_values(ascending=False)``, so
+    top-N tables match the pandas sort they replace.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    present = np.flatnonzero(~missing)[::-1]
+    order = present[values[present].argsort(kind='quicksort')][::-1]
+    return np.concatenate([order, np.flatnonzero(missing)])
+
+
+def top_n_positions(values, n):
+    """Positions of the ``n`` largest ``values``, highest first.
+
+    Uses ``argpartition`` so only the selected rows are sorted; meant for
+    ad-hoc scores that have no precomputed ordering.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = max(0, min(int(n), len(values)))
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    keys = -np.where(np.isnan(values), -np.inf, values)
+    selected = np.argpartition(keys, n - 1)[:n]
+    return selected[np.argsort(keys[selected], kind='stable')]
+
+
+def compute_double_jeopardy(county_stats, percentile=90, table=None):
+    """Identify Double Jeopardy counties - EXACT logic from notebook.
+
+    ``table`` is the scope's precomputed ThresholdTable; thresholds are looked
+    up from it instead of re-sorting ``county_stats``.
+    """
+    if table is None:
+        table = ThresholdTable.from_county_stats(county_stats)
+    median_threshold, max_threshold = table.thresholds(percentile)
+
+    stats = county_stats.copy()
+    stats['Risk_Category'] = risk_labels(table.classify(stats, percentile))
+
+    return stats, median_threshold, max_threshold
+
+
+def compute_vulnerability_profile(table, national=False):
+    """Vulnerability/Hazard scores and mean-line quadrants (Double Jeopardy page).
+
+    Scores every state scope at once from a NormalizationTable, or the
+    national scope when ``national``. Returns the scored frame and each
+    scope's mean vulnerability and hazard, indexed by scope key.
+    """
+    stats = table.county_stats.copy()
+    keys = table.keys(national)
+
+    # Normalize to 0-1 scale (Min-Max normalization), 0.5 when flat
+    stats['vulnerability_score'] = table.scale('mean_median_aqi', 0.5, national)
+    stats['hazard_score'] = table.scale('mean_max_aqi', 0.5, national)
+
+    # Assign risk categories based on each scope's mean lines (for coloring)
+    mean_vuln = table.scope_mean(stats['vulnerability_score'], national)
+    mean_hazard = table.scope_mean(stats['hazard_score'], national)
+    codes = (stats['vulnerability_score'].to_numpy() >= mean_vuln.reindex(keys).to_numpy()).astype(np.int8)
+    codes |= (stats['hazard_score'].to_numpy() >= mean_hazard.reindex(keys).to_numpy()).astype(np.int8) << 1
+    stats['risk_category'] = np.asarray(PROFILE_LABELS, dtype=object)[codes]
+
+    # Compute combined severity score for ranking
+    stats['severity_score'] = (stats['vulnerability_score'] + stats['hazard_score']) / 2
+
+    # Add ranks
+    stats['Vulnerability_Rank'] = table.scope_rank(stats['vulnerability_score'], national).astype(int)
+    stats['Hazard_Rank'] = table.scope_rank(stats['hazard_score'], national).astype(int)
+
+    return stats, mean_vuln, mean_hazard
+
+
+def compute_severity(table, national=False):
+    """Normalized chronic/acute scores, Severity Score and ranks (Severity page).
+
+    Scores every state scope at once from a NormalizationTable, or the
+    national scope when ``national``.
+    """
+    stats = table.county_stats.copy()
+    stats['norm_median'] = table.scale('mean_median_aqi', national=national)
+    stats['norm_max'] = table.scale('mean_max_aqi', national=national)
+    stats['severity_score'] = (stats['norm_median'] + stats['norm_max']) / 2
+
+    # Add ranks
+    stats['Chronic_Rank'] = table.scope_rank(stats['mean_median_aqi'], national).astype(int)
+    stats['Acute_Rank'] = table.scope_rank(stats['mean_max_aqi'], national).astype(int)
+    stats['Severity_Rank'] = table.scope_rank(stats['severity_score'], national).astype(int)
+    return stats
+
+
+def compute_all_exports(risk, severity_stats):
+    """Compute all exportable datasets.
+
+    ``risk`` is ``compute_double_jeopardy``'s result for the scope of
+    ``severity_stats``, whose scores and ranks are added to it.
+    """
+    stats, median_threshold, max_threshold = risk
+    stats = stats.copy()
+    for column in SEVERITY_COLUMNS:
+        stats[column] = severity_stats[column].to_numpy()
+
+    return stats, median_threshold, max_threshold
+
+
+def _threshold_meta(chronic_threshold, acute_threshold):
+    return {'chronic_threshold': float(chronic_threshold), 'acute_threshold': float(acute_threshold)}
+
+
+def _scope_means(means):
+    # JSON object keys are strings
+    return {str(key): float(value) for key, value in means.items()}
+
+
+def severity_stage(table, national=False):
+    """``compute_severity`` as a pipeline stage: ``(frame, meta)``."""
+    return compute_severity(table, national), {}
+
+
+def profile_stage(table, national=False):
+    """``compute_vulnerability_profile`` as a pipeline stage; the scope means go in the metadata."""
+    stats, mean_vuln, mean_hazard = compute_vulnerability_profile(table, national)
+    return stats, {'mean_vulnerability': _scope_means(mean_vuln), 'mean_hazard': _scope_means(mean_hazard)}
+
+
+class AnalyticsEngine:
+    """Memoizing front end over the analytics functions above.
+
+    Stage outputs are persisted in ``artifacts`` (an ArtifactStore) and the
+    results served to pages are memoized in memory on top of them. Results
+    are shared between sessions: callers must not modify returned frames in
+    place.
+    """
+
+    def __init__(self, maxsize=ENGINE_CACHE_SIZE, max_bytes=ENGINE_CACHE_BYTES, artifacts=artifact_store):
+        self.cache = BoundedCache(maxsize, max_bytes, name='engine')
+        self.artifacts = artifacts
+
+    def _run(self, query, compute):
+        key = (dataset_version(), query)
+        return self.cache.get_or_compute(key, lambda: compute(query))
+
+    def _stage(self, query, inputs, params, build):
+        """Artifact of the pipeline stage ``query.method``, memoized per query.
+
+        ``inputs`` returns the digests the stage depends on and ``build(q)``
+        its ``(frame, meta)``; both only run when the artifact is not
+        already in memory.
+        """
+        return self._run(query, lambda q: self.artifacts.get_or_compute(
+            q.method, inputs(q), params, lambda: build(q)
+        ))
+
+    def _aggregate(self, year_min=None, year_max=None):
+        """Stage 'aggregate': national county stats for a year range.
+
+        Depends only on the checksums of the year files in range and on the
+        ids and names of the counties with data in range, so a year file that
+        adds counties leaves the aggregates of other ranges untouched.
+        """
+        def inputs(q):
+            cube = get_year_cube()
+            return year_checksums(q.year_min, q.year_max) + [
+                cube.dimension.rows_digest(cube.present(q.year_min, q.year_max))
+            ]
+
+        query = normalize_query('aggregate', year_min, year_max)
+        return self._stage(
+            query,
+            inputs,
+            {},
+            lambda q: (self._scope(q), {}),
+        )
+
+    @staticmethod
+    def _scope(query):
+        return scope_county_stats(query.year_min, query.year_max, query.state)
+
+    @staticmethod
+    def _table(query):
+        return get_threshold_table(query.year_min, query.year_max, query.state)
+
+    def county_stats(self, year_min=None, year_max=None, state=None):
+        query = normalize_query('county_stats', year_min, year_max, state)
+        if query.state is None:
+            return self._aggregate(query.year_min, query.year_max).frame
+        return self._run(query, lambda q: self._in_scope(self._aggregate(q.year_min, q.year_max).frame, q))
+
+    def _classify(self, year_min=None, year_max=None, state=None, percentile=90):
+        """Stage 'classify': Double Jeopardy categories and thresholds at a percentile."""
+        def build(q):
+            stats, chronic, acute = compute_double_jeopardy(
+                self.county_stats(q.year_min, q.year_max, q.state), q.percentile, self._table(q)
+            )
+            return stats, _threshold_meta(chronic, acute)
+
+        query = normalize_query('classify', year_min, year_max, state, percentile)
+        return self._stage(
+            query,
+            lambda q: [self._aggregate(q.year_min, q.year_max).digest],
+            {'state': query.state, 'percentile': query.percentile},
+            build,
+        )
+
+    def double_jeopardy(self, year_min=None, year_max=None, state=None, percentile=90):
+        """``(stats, chronic_threshold, acute_threshold)`` at a percentile."""
+        artifact = self._classify(year_min, year_max, state, percentile)
+        return artifact.frame, artifact.meta['chronic_threshold'], artifact.meta['acute_threshold']
+
+    def normalization_table(self, year_min=None, year_max=None):
+        """National and per-state metric bounds for a year range."""
+        query = normalize_query('normalization', year_min, year_max)
+        return self._run(query, lambda q: NormalizationTable(self.county_stats(q.year_min, q.year_max)))
+
+    def _all_scopes(self, method, build, query):
+        """Stage 'score:<method>': ``build`` over every state scope (or the
+        nation) for the query's years."""
+        national = query.state is None
+        scopes = normalize_query(f'score:{method}', query.year_min, query.year_max, 'national' if national else 'states')
+        return self._stage(
+            scopes,
+            lambda q: [self._aggregate(q.year_min, q.year_max).digest],
+            {'national': national},
+            lambda q: build(self.normalization_table(q.year_min, q.year_max), national),
+        )
+
+    @staticmethod
+    def _scope_key(query):
+        if query.state is None:
+            return NormalizationTable.NATIONAL
+        return get_year_cube().dimension.state_code(query.state)
+
+    def _in_scope(self, frame, query):
+        """Rows of an all-scopes frame that belong to the query's state."""
+        if query.state is None:
+            return frame
+        in_state = frame['county_id'].to_numpy() // 1000 == self._scope_key(query)
+        return frame[in_state].reset_index(drop=True)
+
+    def vulnerability_profile(self, year_min=None, year_max=None, state=None):
+        """``(stats, mean_vulnerability, mean_hazard)`` for the mean-line method."""
+        def compute(q):
+            artifact = self._all_scopes('mean', profile_stage, q)
+            key = str(self._scope_key(q))
+            return (self._in_scope(artifact.frame, q),
+                    artifact.meta['mean_vulnerability'][key], artifact.meta['mean_hazard'][key])
+
+        query = normalize_query('mean', year_min, year_max, state)
+        return self._run(query, compute)
+
+    def severity(self, year_min=None, year_max=None, state=None):
+        query = normalize_query('severity', year_min, year_max, state)
+        return self._run(query, lambda q: self._in_scope(self._all_scopes('severity', severity_stage, q).frame, q))
+
+    def exports(self, year_min=None, year_max=None, state=None, percentile=90):
+        """``(stats, chronic_threshold, acute_threshold)`` with scores and ranks."""
+        def build(q):
+            stats, chronic, acute = compute_all_exports(
+                self.double_jeopardy(q.year_min, q.year_max, q.state, q.percentile),
+                self.severity(q.year_min, q.year_max, q.state),
+            )
+            return stats, _threshold_meta(chronic, acute)
+
+        query = normalize_query('export', year_min, year_max, state, percentile)
+        artifact = self._stage(
+            query,
+            lambda q: [
+                self._classify(q.year_min, q.year_max, q.state, q.percentile).digest,
+                self._all_scopes('severity', severity_stage, q).digest,
+            ],
+            {},
+            build,
+        )
+        return artifact.frame, artifact.meta['chronic_threshold'], artifact.meta['acute_threshold']
+
+    def _frame(self, source, year_min=None, year_max=None, state=None):
+        result = getattr(self, source)(year_min, year_max, state)
+        return result[0] if isinstance(result, tuple) else result
+
+    def ordering(self, metric, year_min=None, year_max=None, state=None, source=None):
+        """Row positions of a scope's result set sorted by ``metric``, high to low.
+
+        Built once per scope and metric; ``top_n`` only slices it.
+        """
+        source = source or TOP_N_SOURCES.get(metric, 'county_stats')
+        query = normalize_query(f'order:{source}:{metric}', year_min, year_max, state)
+        return self._run(query, lambda q: descending_order(
+            self._frame(source, q.year_min, q.year_max, q.state)[metric].to_numpy(dtype=np.float64)
+        ))
+
+    def top_n(self, metric, n, year_min=None, year_max=None, state=None, source=None):
+        """The ``n`` highest rows of a scope by ``metric``, highest first.
+
+        ``metric`` is a column of the ``source`` result set (by default the one
+        in ``TOP_N_SOURCES``), served from the cached ordering. An array of
+        ad-hoc scores aligned with that result set is ranked with
+        ``top_n_positions`` instead.
+        """
+        if source is None:
+            source = TOP_N_SOURCES.get(metric, 'county_stats') if isinstance(metric, str) else 'county_stats'
+        frame = self._frame(source, year_min, year_max, state)
+        if isinstance(metric, str):
+            positions = self.ordering(metric, year_min, year_max, state, source)[:max(int(n), 0)]
+        else:
+            positions = top_n_positions(metric, n)
+        return frame.take(positions)
+
+    def cache_info(self):
+        """Hit/miss counts, hit rate, entry count and bytes of the result cache."""
+        return self.cache.info()
+
+
+@lru_cache(maxsize=1)
+def get_engine():
+    """Process-wide engine shared by all pages and sessions."""
+    return AnalyticsEngine()
@@ -0,0 +1,196 @@
+"""
+Dataset exports for the AQI Dashboard
+Files (CSV, CSV.gz, Parquet, Arrow IPC or a ZIP bundle) are produced on
+demand, written in chunks, and cached as bytes per export, format,
+methodology and dataset version.
+"""
+
+import gzip
+import io
+import zipfile
+
+from cache import BoundedCache, cache_budget
+from data import HAS_PYARROW, dataset_version
+from engine import get_engine
+
+if HAS_PYARROW:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+# Bump when the export columns or the scoring methodology change
+METHODOLOGY_VERSION = 1
+
+# Serialized export files kept across all sessions in the process
+EXPORT_CACHE_SIZE = 32
+EXPORT_CACHE_BYTES = cache_budget(0.2)
+
+
+def double_jeopardy_export(full_stats):
+    """Double Jeopardy counties, worst Severity Score first."""
+    dj_counties = full_stats[full_stats['Risk_Category'] == 'Double Jeopardy']
+    dj_export = dj_counties[['County', 'State', 'mean_median_aqi', 'mean_max_aqi',
+                             'Chronic_Rank', 'Acute_Rank', 'severity_score', 'Severity_Rank']]
+    dj_export.columns = ['County', 'State', 'Mean_Median_AQI', 'Mean_Max_AQI',
+                         'Chronic_Rank', 'Acute_Rank', 'Severity_Score', 'Severity_Rank']
+    return dj_export.sort_values('Severity_Score', ascending=False).round(3)
+
+
+def top_severity_export(full_stats, n=50):
+    """Top ``n`` counties by combined Severity Score."""
+    top_severity = full_stats.nlargest(n, 'severity_score')
+    severity_export = top_severity[['County', 'State', 'mean_median_aqi', 'mean_max_aqi',
+                                    'norm_median', 'norm_max', 'severity_score',
+                                    'Risk_Category', 'Severity_Rank']]
+    severity_export.columns = ['County', 'State', 'Mean_Median_AQI', 'Mean_Max_AQI',
+                               'Norm_Chronic', 'Norm_Acute', 'Severity_Score',
+                               'Risk_Category', 'Severity_Rank']
+    return severity_export.round(3)
+
+
+def full_export(full_stats):
+    """All counties with aggregated statistics, risk categories and severity scores."""
+    export = full_stats[['County', 'State', 'mean_median_aqi', 'mean_max_aqi',
+                         'norm_median', 'norm_max', 'severity_score',
+                         'Risk_Category', 'Chronic_Rank', 'Acute_Rank', 'Severity_Rank']]
+    export.columns = ['County', 'State', 'Mean_Median_AQI', 'Mean_Max_AQI',
+                      'Norm_Chronic', 'Norm_Acute', 'Severity_Score',
+                      'Risk_Category', 'Chronic_Rank', 'Acute_Rank', 'Severity_Rank']
+    return export.sort_values('Severity_Score', ascending=False).round(3)
+
+
+EXPORTS = {
+    'double_jeopardy': double_jeopardy_export,
+    'top_severity': top_severity_export,
+    'full': full_export,
+}
+
+# File names (without extension) of the exports and of the ZIP bundle
+EXPORT_FILE_NAMES = {
+    'double_jeopardy': 'double_jeopardy_counties',
+    'top_severity': 'top_severity_counties',
+    'full': 'all_county_statistics',
+}
+BUNDLE = 'bundle'
+BUNDLE_FILE_NAME = 'airrisk_exports'
+
+# Export formats: (file extension, MIME type, label)
+FORMATS = {
+    'csv': ('.csv', 'text/csv', 'CSV'),
+    'csv.gz': ('.csv.gz', 'application/gzip', 'CSV (gzip)'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet', 'Parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file', 'Arrow IPC'),
+}
+ARROW_FORMATS = ('parquet', 'arrow')
+
+# Rows serialized at a time (CSV chunk, Parquet row group, Arrow record batch)
+EXPORT_CHUNK_ROWS = 50_000
+
+_export_bytes = BoundedCache(EXPORT_CACHE_SIZE, EXPORT_CACHE_BYTES, name='exports')
+
+
+def available_formats():
+    """Export formats usable in this environment (Parquet/Arrow need pyarrow)."""
+    return [fmt for fmt in FORMATS if HAS_PYARROW or fmt not in ARROW_FORMATS]
+
+
+def export_file_name(name, fmt='csv'):
+    if name == BUNDLE:
+        return f"{BUNDLE_FILE_NAME}_{fmt.replace('.', '_')}.zip"
+    return EXPORT_FILE_NAMES.get(name, name) + FORMATS[fmt][0]
+
+
+def export_mime(name, fmt='csv'):
+    return 'application/zip' if name == BUNDLE else FORMATS[fmt][1]
+
+
+def _chunks(frame, chunk_rows):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield start, frame.iloc[start:start + chunk_rows]
+
+
+def _write_csv(frame, fh, chunk_rows):
+    for start, chunk in _chunks(frame, chunk_rows):
+        fh.write(chunk.to_csv(index=False, header=start == 0).encode('utf-8'))
+
+
+def write_export(frame, fmt, fh, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write ``frame`` to the binary file object ``fh`` as ``fmt``, chunk by chunk.
+
+    Output never exists as a single Python string: CSV is encoded one chunk
+    at a time, Parquet gets one row group and Arrow IPC one record batch per
+    chunk. Identical frames always give identical bytes.
+    """
+    if fmt == 'csv':
+        _write_csv(frame, fh, chunk_rows)
+    elif fmt == 'csv.gz':
+        # mtime=0 keeps the gzip header (and so the bytes) reproducible
+        with gzip.GzipFile(fileobj=fh, mode='wb', mtime=0) as gz:
+            _write_csv(frame, gz, chunk_rows)
+    elif fmt in ARROW_FORMATS:
+        if not HAS_PYARROW:
+            raise ImportError(f"pyarrow is required for {fmt} exports")
+        schema = pa.Schema.from_pandas(frame, preserve_index=False)
+        writer = pq.ParquetWriter(fh, schema) if fmt == 'parquet' else pa.ipc.new_file(fh, schema)
+        with writer:
+            for _, chunk in _chunks(frame, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    else:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+
+
+def write_bundle(frames, fmt, fh, chunk_rows=EXPORT_CHUNK_ROWS):
+    """ZIP archive with one ``fmt`` file per ``{file name: frame}`` entry."""
+    with zipfile.ZipFile(fh, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for file_name, frame in frames.items():
+            # Fixed timestamps keep the archive bytes reproducible
+            info = zipfile.ZipInfo(file_name + FORMATS[fmt][0], date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, 'w', force_zip64=True) as member:
+                write_export(frame, fmt, member, chunk_rows)
+
+
+def frame_bytes(frame, fmt='csv', key=None):
+    """Serialize any engine result frame.
+
+    With a ``key`` (e.g. ``('county', county_id)``) the bytes are cached
+    under it and the current dataset version.
+    """
+    def build():
+        buffer = io.BytesIO()
+        write_export(frame, fmt, buffer)
+        return buffer.getvalue()
+
+    if key is None:
+        return build()
+    return _export_bytes.get_or_compute((key, fmt, dataset_version()), build)
+
+
+def export_bytes(name, fmt='csv', percentile=90):
+    """Bytes of export ``name`` (or ``BUNDLE``: a ZIP of all exports), built on first request."""
+    methodology = (METHODOLOGY_VERSION, int(percentile))
+    key = (name, fmt, methodology, dataset_version())
+
+    def build():
+        full_stats, _, _ = get_engine().exports(percentile=percentile)
+        buffer = io.BytesIO()
+        if name == BUNDLE:
+            frames = {EXPORT_FILE_NAMES[export]: make(full_stats) for export, make in EXPORTS.items()}
+            write_bundle(frames, fmt, buffer)
+        else:
+            write_export(EXPORTS[name](full_stats), fmt, buffer)
+        return buffer.getvalue()
+
+    return _export_bytes.get_or_compute(key, build)
+
+
+def export_download(name, fmt='csv', percentile=90):
+    """Zero-argument callable for ``st.download_button(data=...)``.
+
+    Nothing is serialized until the user clicks the button.
+    """
+    return lambda: export_bytes(name, fmt, percentile)
+
+
+def export_cache_info():
+    """Hit/miss counts, hit rate, entry count and bytes of the export cache."""
+    return _export_bytes.info()
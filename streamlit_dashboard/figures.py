@@ -0,0 +1,55 @@
+"""
+Plotly figure cache for the AQI Dashboard
+Figures are built once per distinct input; repeat renders rehydrate the
+stored figure JSON instead of rebuilding and re-validating the figure.
+"""
+
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+
+from cache import BoundedCache, cache_budget, content_key
+
+# Serialized figures kept across all sessions in the process
+FIGURE_CACHE_SIZE = 128
+FIGURE_CACHE_BYTES = cache_budget(0.15)
+
+# Scatter plots with more points than this render with WebGL (Scattergl)
+WEBGL_POINT_THRESHOLD = 2000
+
+_figures = BoundedCache(FIGURE_CACHE_SIZE, FIGURE_CACHE_BYTES, name='figures')
+
+
+def figure_key(name, *data, **options):
+    """Content hash of a chart's name, input data and options."""
+    return content_key(name, *data, options)
+
+
+def cached_figure(name, build, *data, **options):
+    """Return ``build(*data, **options)``, built at most once per distinct input.
+
+    ``data`` are the frames/arrays the chart is drawn from and ``options``
+    any other (JSON-serializable) values it depends on; together with
+    ``name`` they form the cache key. The figure is stored as JSON and
+    rehydrated without plotly's property validation, which already ran when
+    it was first built.
+    """
+    key = figure_key(name, *data, **options)
+    spec = _figures.get_or_compute(key, lambda: build(*data, **options).to_json())
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+def scatter_trace_type(n_points):
+    """``go.Scattergl`` above ``WEBGL_POINT_THRESHOLD`` points, else SVG ``go.Scatter``."""
+    return go.Scattergl if n_points > WEBGL_POINT_THRESHOLD else go.Scatter
+
+
+def typed_array(values, dtype=np.float32):
+    """Contiguous numeric array; plotly sends these as binary (base64) typed arrays."""
+    return np.ascontiguousarray(values, dtype=dtype)
+
+
+def figure_cache_info():
+    """Hit/miss counts, hit rate, entry count and bytes of the figure cache."""
+    return _figures.info()
@@ -9,12 +9,15 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import os
-import re
 import sys
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from styles import apply_shared_styles, page_header, section_label, section_divider
+from charts import build_severity_chart
+from figures import cached_figure
+from data import load_data
+from engine import get_engine
 
 st.set_page_config(page_title="AirRisk - Severity Score", page_icon="📈", layout="wide")
 
@@ -24,43 +27,13 @@ apply_shared_styles(st)
 # =============================================================================
 # DATA LOADING
 # =============================================================================
-@st.cache_data
-def load_data():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.dirname(os.path.dirname(current_dir))
-    
-    file_paths = [
-        os.path.join(data_dir, "annual_aqi_by_county_2021.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2022.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2023.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2024.csv"),
-    ]
-    
-    df_list = []
-    for file in file_paths:
-        if os.path.exists(file):
-            current_df = pd.read_csv(file)
-            match = re.search(r'(\d{4})\.csv', file)
-            if match:
-                current_df['Year'] = int(match.group(1))
-            df_list.append(current_df)
-    
-    return pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
-
-def compute_county_stats(df):
-    county_stats = df.groupby(['State', 'County']).agg({
-        'Median AQI': 'mean',
-        'Max AQI': 'mean'
-    }).reset_index()
-    county_stats.columns = ['State', 'County', 'mean_median_aqi', 'mean_max_aqi']
-    return county_stats
-
 df = load_data()
 if df.empty:
     st.error("No data found.")
     st.stop()
 
-county_stats = compute_county_stats(df)
+engine = get_engine()
+county_stats = engine.county_stats()
 
 # =============================================================================
 # PAGE CONTENT
@@ -120,86 +93,46 @@ with col1:
     states = ['All States'] + sorted(county_stats['State'].unique().tolist())
     selected_state = st.selectbox("Select State", states, key="severity_state")
 
-with col2:
+section_divider(st)
+
+# =============================================================================
+# CHART
+# =============================================================================
+# The Top N slider only feeds the chart and the data table, so they form a
+# fragment: moving it reruns just this section, not the whole page
+@st.fragment
+def top_counties_section(selected_state):
     top_n = st.slider("Show Top N Counties", min_value=10, max_value=50, value=15, step=5, key="severity_topn")
 
-# Filter data
-if selected_state != 'All States':
-    filtered_stats = county_stats[county_stats['State'] == selected_state].copy()
-else:
-    filtered_stats = county_stats.copy()
+    # Get top N by severity - normalized using filtered data
+    # (scores and their ordering are cached by the engine per state)
+    severity_top = engine.top_n('severity_score', top_n, state=selected_state)
 
-# Compute normalized scores and severity - using filtered data for normalization
-stats_with_severity = filtered_stats.copy()
-stats_with_severity['norm_median'] = (stats_with_severity['mean_median_aqi'] - stats_with_severity['mean_median_aqi'].min()) / \
-                                     (stats_with_severity['mean_median_aqi'].max() - stats_with_severity['mean_median_aqi'].min())
-stats_with_severity['norm_max'] = (stats_with_severity['mean_max_aqi'] - stats_with_severity['mean_max_aqi'].min()) / \
-                                  (stats_with_severity['mean_max_aqi'].max() - stats_with_severity['mean_max_aqi'].min())
-stats_with_severity['severity_score'] = (stats_with_severity['norm_median'] + stats_with_severity['norm_max']) / 2
+    section_label(st, f"Top {top_n} Counties by Severity Score")
 
-# Get top N by severity
-severity_top = stats_with_severity.sort_values('severity_score', ascending=False).head(top_n)
+    # Built once per distinct input (see figures.py)
+    fig = cached_figure('severity_top', build_severity_chart, severity_top, top_n=top_n)
 
-section_divider(st)
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("📋 View Full Data Table"):
+        display_df = severity_top[['County', 'State', 'mean_median_aqi', 'mean_max_aqi', 
+                                   'norm_median', 'norm_max', 'severity_score']].copy()
+        display_df.columns = ['County', 'State', 'Mean Median AQI', 'Mean Max AQI', 
+                              'Norm. Chronic', 'Norm. Acute', 'Severity Score']
+        display_df = display_df.round(3)
+        display_df.index = range(1, len(display_df) + 1)
+        st.dataframe(display_df, use_container_width=True)
 
-# =============================================================================
-# CHART
-# =============================================================================
-section_label(st, f"Top {top_n} Counties by Severity Score")
-
-fig = px.bar(
-    severity_top.sort_values('severity_score', ascending=False),
-    x='severity_score',
-    y='County',
-    color='State',
-    orientation='h',
-    hover_data={
-        'State': True,
-        'mean_median_aqi': ':.1f',
-        'mean_max_aqi': ':.1f',
-        'norm_median': ':.3f',
-        'norm_max': ':.3f',
-        'severity_score': ':.3f'
-    },
-    labels={
-        'severity_score': 'Severity Score (0-1)',
-        'County': '',
-        'State': 'State',
-        'norm_median': 'Normalized Chronic',
-        'norm_max': 'Normalized Acute'
-    },
-    color_discrete_sequence=px.colors.sequential.Plasma
-)
-
-fig.update_layout(
-    height=max(400, top_n * 28),
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='white',
-    font=dict(family="Inter, sans-serif", size=12),
-    legend=dict(
-        orientation="h",
-        yanchor="bottom",
-        y=1.02,
-        xanchor="center",
-        x=0.5,
-        title=""
-    ),
-    margin=dict(l=20, r=20, t=60, b=40),
-    xaxis_title="Severity Score (0 = Best, 1 = Worst)",
-    yaxis_title="",
-    xaxis_range=[0, 1]
-)
-
-fig.update_xaxes(gridcolor='#e2e8f0', zeroline=True, zerolinecolor='#cbd5e0')
-fig.update_yaxes(gridcolor='#e2e8f0')
-
-st.plotly_chart(fig, use_container_width=True)
+
+top_counties_section(selected_state)
 
 # =============================================================================
 # INTERPRETATION
 # =============================================================================
-if len(severity_top) > 0:
-    worst_county = severity_top.iloc[0]
+worst = engine.top_n('severity_score', 1, state=selected_state)
+if len(worst) > 0:
+    worst_county = worst.iloc[0]
     st.markdown(f"""
     <div class="info-card">
     <h4 style="margin-top: 0; color: #9333ea; border-bottom: 1px solid #faf5ff; padding-bottom: 12px;">💡 What This Means</h4>
@@ -214,15 +147,3 @@ if len(severity_top) > 0:
     prioritize intervention by identifying counties with the highest <em>overall</em> pollution burden.</p>
     </div>
     """, unsafe_allow_html=True)
-
-# =============================================================================
-# DATA TABLE
-# =============================================================================
-with st.expander("📋 View Full Data Table"):
-    display_df = severity_top[['County', 'State', 'mean_median_aqi', 'mean_max_aqi', 
-                               'norm_median', 'norm_max', 'severity_score']].copy()
-    display_df.columns = ['County', 'State', 'Mean Median AQI', 'Mean Max AQI', 
-                          'Norm. Chronic', 'Norm. Acute', 'Severity Score']
-    display_df = display_df.round(3)
-    display_df.index = range(1, len(display_df) + 1)
-    st.dataframe(display_df, use_container_width=True)
@@ -8,14 +8,17 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import os
-import re
 import sys
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from styles import apply_shared_styles, page_header, section_label, section_divider
+from charts import build_trend_chart
+from figures import cached_figure
+from exports import frame_bytes
+from data import load_data, available_years, year_span_label
+from analytics import get_rank_index, get_threshold_table
 
 st.set_page_config(page_title="AirRisk - County Drilldown", page_icon="🔍", layout="wide")
 
@@ -25,52 +28,24 @@ apply_shared_styles(st)
 # =============================================================================
 # DATA LOADING
 # =============================================================================
-@st.cache_data
-def load_data():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.dirname(os.path.dirname(current_dir))
-    
-    file_paths = [
-        os.path.join(data_dir, "annual_aqi_by_county_2021.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2022.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2023.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2024.csv"),
-    ]
-    
-    df_list = []
-    for file in file_paths:
-        if os.path.exists(file):
-            current_df = pd.read_csv(file)
-            match = re.search(r'(\d{4})\.csv', file)
-            if match:
-                current_df['Year'] = int(match.group(1))
-            df_list.append(current_df)
-    
-    return pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
-
-def compute_county_stats(df):
-    county_stats = df.groupby(['State', 'County']).agg({
-        'Median AQI': 'mean',
-        'Max AQI': 'mean'
-    }).reset_index()
-    county_stats.columns = ['State', 'County', 'mean_median_aqi', 'mean_max_aqi']
-    return county_stats
-
 df = load_data()
 if df.empty:
     st.error("No data found.")
     st.stop()
 
-county_stats = compute_county_stats(df)
+rank_index = get_rank_index()
+county_stats = rank_index.county_stats
+years_label = year_span_label()
+n_years = len(available_years())
 
 # =============================================================================
 # PAGE CONTENT
 # =============================================================================
 page_header(st, "County Drilldown", "Explore Individual County Profiles", "🔍")
 
-st.markdown("""
+st.markdown(f"""
 <div class="callout-box-teal">
-<strong>Deep Dive:</strong> Select a specific county to view its air quality trends over 2021-2024, 
+<strong>Deep Dive:</strong> Select a specific county to view its air quality trends over {years_label}, 
 understand how it compares to thresholds, and download its data for further analysis.
 </div>
 """, unsafe_allow_html=True)
@@ -85,12 +60,13 @@ section_label(st, "Select County")
 col1, col2, col3 = st.columns([1, 1, 1])
 
 with col1:
-    states = sorted(df['State'].unique().tolist())
+    states = sorted(rank_index.counties_by_state)
     selected_state = st.selectbox("Select State", states, key="drilldown_state")
 
 with col2:
-    counties_in_state = sorted(df[df['State'] == selected_state]['County'].unique().tolist())
-    selected_county = st.selectbox("Select County", counties_in_state, key="drilldown_county")
+    counties_in_state = rank_index.counties_by_state[selected_state]
+    selected_county = st.selectbox("Select County", list(counties_in_state), key="drilldown_county")
+    county_id = counties_in_state[selected_county]
 
 with col3:
     percentile = st.slider(
@@ -102,7 +78,7 @@ with col3:
 # =============================================================================
 # COUNTY DATA
 # =============================================================================
-county_data = df[(df['State'] == selected_state) & (df['County'] == selected_county)].copy()
+county_data = rank_index.county_rows(county_id)
 county_yearly = county_data.groupby('Year').agg({
     'Median AQI': 'mean',
     'Max AQI': 'mean',
@@ -112,12 +88,10 @@ county_yearly = county_data.groupby('Year').agg({
 }).reset_index()
 
 # Get county aggregated stats
-county_agg = county_stats[(county_stats['State'] == selected_state) & 
-                          (county_stats['County'] == selected_county)].iloc[0]
+county_agg = rank_index.county(county_id)
 
-# Calculate thresholds for Double Jeopardy check
-median_threshold = county_stats['mean_median_aqi'].quantile(percentile / 100)
-max_threshold = county_stats['mean_max_aqi'].quantile(percentile / 100)
+# Look up thresholds for Double Jeopardy check (precomputed per scope)
+median_threshold, max_threshold = get_threshold_table().thresholds(percentile)
 
 is_high_chronic = county_agg['mean_median_aqi'] >= median_threshold
 is_high_acute = county_agg['mean_max_aqi'] >= max_threshold
@@ -135,7 +109,7 @@ col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     st.metric(
-        "4-Year Mean Median AQI",
+        f"{n_years}-Year Mean Median AQI",
         f"{county_agg['mean_median_aqi']:.1f}",
         delta=f"{'Above' if is_high_chronic else 'Below'} {percentile}th %ile",
         delta_color="inverse" if is_high_chronic else "normal"
@@ -143,14 +117,14 @@ with col1:
 
 with col2:
     st.metric(
-        "4-Year Mean Max AQI",
+        f"{n_years}-Year Mean Max AQI",
         f"{county_agg['mean_max_aqi']:.1f}",
         delta=f"{'Above' if is_high_acute else 'Below'} {percentile}th %ile",
         delta_color="inverse" if is_high_acute else "normal"
     )
 
 with col3:
-    chronic_rank = (county_stats['mean_median_aqi'] >= county_agg['mean_median_aqi']).sum()
+    chronic_rank = rank_index.rank('mean_median_aqi', county_id)
     st.metric(
         "Chronic Rank",
         f"#{chronic_rank}",
@@ -158,7 +132,7 @@ with col3:
     )
 
 with col4:
-    acute_rank = (county_stats['mean_max_aqi'] >= county_agg['mean_max_aqi']).sum()
+    acute_rank = rank_index.rank('mean_max_aqi', county_id)
     st.metric(
         "Acute Rank",
         f"#{acute_rank}",
@@ -195,56 +169,14 @@ else:
 # =============================================================================
 # YEARLY TREND CHART
 # =============================================================================
-st.markdown("### 📈 Yearly Trends (2021-2024)")
-
-fig = make_subplots(rows=1, cols=2, subplot_titles=("Median AQI (Daily Exposure)", "Max AQI (Peak Events)"))
-
-# Median AQI trend
-fig.add_trace(
-    go.Scatter(
-        x=county_yearly['Year'],
-        y=county_yearly['Median AQI'],
-        mode='lines+markers',
-        name='Median AQI',
-        line=dict(color='#3182ce', width=3),
-        marker=dict(size=10)
-    ),
-    row=1, col=1
-)
-
-# Add chronic threshold line
-fig.add_hline(y=median_threshold, line_dash="dash", line_color="#dd6b20", 
-              annotation_text=f"{percentile}th %ile Threshold", row=1, col=1)
-
-# Max AQI trend
-fig.add_trace(
-    go.Scatter(
-        x=county_yearly['Year'],
-        y=county_yearly['Max AQI'],
-        mode='lines+markers',
-        name='Max AQI',
-        line=dict(color='#c53030', width=3),
-        marker=dict(size=10)
-    ),
-    row=1, col=2
-)
+st.markdown(f"### 📈 Yearly Trends ({years_label})")
 
-# Add acute threshold line
-fig.add_hline(y=max_threshold, line_dash="dash", line_color="#dd6b20", 
-              annotation_text=f"{percentile}th %ile Threshold", row=1, col=2)
-
-fig.update_layout(
-    height=400,
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='white',
-    font=dict(family="Inter, sans-serif", size=12),
-    showlegend=False,
-    margin=dict(l=20, r=20, t=60, b=40)
+# Built once per distinct input (see figures.py)
+fig = cached_figure(
+    'county_trend', build_trend_chart, county_yearly[['Year', 'Median AQI', 'Max AQI']],
+    median_threshold=median_threshold, max_threshold=max_threshold, percentile=percentile
 )
 
-fig.update_xaxes(gridcolor='#e2e8f0', dtick=1)
-fig.update_yaxes(gridcolor='#e2e8f0')
-
 st.plotly_chart(fig, use_container_width=True)
 
 # =============================================================================
@@ -282,11 +214,11 @@ display_df = display_df.round(1)
 
 st.dataframe(display_df, use_container_width=True)
 
-# Download button
-csv = county_data.to_csv(index=False)
+# Download button (CSV built on click and cached per county, see exports.py);
+# the file keeps the source columns, without the internal county_id
 st.download_button(
     label="📥 Download County Data (CSV)",
-    data=csv,
+    data=lambda: frame_bytes(county_data.drop(columns='county_id'), 'csv', key=('county', county_id)),
     file_name=f"{selected_county}_{selected_state}_aqi_data.csv",
     mime="text/csv"
 )
@@ -7,12 +7,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
-import re
 import sys
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from styles import apply_shared_styles, page_header, section_label, section_divider
+from data import load_data, available_years, year_span_label
+from engine import get_engine
+from exports import BUNDLE, FORMATS, available_formats, export_download, export_file_name, export_mime
 
 st.set_page_config(page_title="AirRisk - Download & Methodology", page_icon="📥", layout="wide")
 
@@ -22,73 +24,14 @@ apply_shared_styles(st)
 # =============================================================================
 # DATA LOADING
 # =============================================================================
-@st.cache_data
-def load_data():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.dirname(os.path.dirname(current_dir))
-    
-    file_paths = [
-        os.path.join(data_dir, "annual_aqi_by_county_2021.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2022.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2023.csv"),
-        os.path.join(data_dir, "annual_aqi_by_county_2024.csv"),
-    ]
-    
-    df_list = []
-    for file in file_paths:
-        if os.path.exists(file):
-            current_df = pd.read_csv(file)
-            match = re.search(r'(\d{4})\.csv', file)
-            if match:
-                current_df['Year'] = int(match.group(1))
-            df_list.append(current_df)
-    
-    return pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
-
-def compute_county_stats(df):
-    county_stats = df.groupby(['State', 'County']).agg({
-        'Median AQI': 'mean',
-        'Max AQI': 'mean'
-    }).reset_index()
-    county_stats.columns = ['State', 'County', 'mean_median_aqi', 'mean_max_aqi']
-    return county_stats
-
-def compute_all_exports(df, county_stats, percentile=90):
-    """Compute all exportable datasets."""
-    
-    # Thresholds
-    median_threshold = county_stats['mean_median_aqi'].quantile(percentile / 100)
-    max_threshold = county_stats['mean_max_aqi'].quantile(percentile / 100)
-    
-    # Risk categories
-    stats = county_stats.copy()
-    stats['Risk_Category'] = 'Low Risk'
-    stats.loc[(stats['mean_median_aqi'] >= median_threshold), 'Risk_Category'] = 'High Chronic'
-    stats.loc[(stats['mean_max_aqi'] >= max_threshold), 'Risk_Category'] = 'High Acute'
-    stats.loc[(stats['mean_median_aqi'] >= median_threshold) & 
-              (stats['mean_max_aqi'] >= max_threshold), 'Risk_Category'] = 'Double Jeopardy'
-    
-    # Severity score
-    stats['norm_median'] = (stats['mean_median_aqi'] - stats['mean_median_aqi'].min()) / \
-                           (stats['mean_median_aqi'].max() - stats['mean_median_aqi'].min())
-    stats['norm_max'] = (stats['mean_max_aqi'] - stats['mean_max_aqi'].min()) / \
-                        (stats['mean_max_aqi'].max() - stats['mean_max_aqi'].min())
-    stats['severity_score'] = (stats['norm_median'] + stats['norm_max']) / 2
-    
-    # Add ranks
-    stats['Chronic_Rank'] = stats['mean_median_aqi'].rank(ascending=False).astype(int)
-    stats['Acute_Rank'] = stats['mean_max_aqi'].rank(ascending=False).astype(int)
-    stats['Severity_Rank'] = stats['severity_score'].rank(ascending=False).astype(int)
-    
-    return stats, median_threshold, max_threshold
-
 df = load_data()
 if df.empty:
     st.error("No data found.")
     st.stop()
 
-county_stats = compute_county_stats(df)
-full_stats, median_thresh, max_thresh = compute_all_exports(df, county_stats)
+years_label = year_span_label()
+n_years = len(available_years())
+full_stats, median_thresh, max_thresh = get_engine().exports()
 
 # =============================================================================
 # PAGE CONTENT
@@ -102,29 +45,38 @@ section_divider(st)
 # =============================================================================
 section_label(st, "Data Downloads")
 
+export_format = st.selectbox(
+    "File Format",
+    available_formats(),
+    format_func=lambda fmt: FORMATS[fmt][2],
+    key="export_format",
+    help="Parquet and Arrow IPC keep column types and load much faster into pandas, R or DuckDB."
+)
+
+
+def download_button(label, name):
+    # Exports are serialized only when a button is clicked (see exports.py)
+    st.download_button(
+        label=label,
+        data=export_download(name, export_format),
+        file_name=export_file_name(name, export_format),
+        mime=export_mime(name, export_format)
+    )
+
+
 col1, col2 = st.columns(2)
 
 with col1:
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-card">
     <h4 style="margin-top: 0; color: #dc2626; border-bottom: 1px solid #fef2f2; padding-bottom: 12px;">🔴 Double Jeopardy Counties</h4>
-    <p style="margin-bottom: 0;">Counties exceeding the 90th percentile for BOTH Mean Median AQI and Mean Max AQI (2021-2024).</p>
+    <p style="margin-bottom: 0;">Counties exceeding the 90th percentile for BOTH Mean Median AQI and Mean Max AQI ({years_label}).</p>
     </div>
     """, unsafe_allow_html=True)
     
-    dj_counties = full_stats[full_stats['Risk_Category'] == 'Double Jeopardy'].copy()
-    dj_export = dj_counties[['County', 'State', 'mean_median_aqi', 'mean_max_aqi', 
-                             'Chronic_Rank', 'Acute_Rank', 'severity_score', 'Severity_Rank']]
-    dj_export.columns = ['County', 'State', 'Mean_Median_AQI', 'Mean_Max_AQI', 
-                         'Chronic_Rank', 'Acute_Rank', 'Severity_Score', 'Severity_Rank']
-    dj_export = dj_export.sort_values('Severity_Score', ascending=False).round(3)
+    dj_count = int((full_stats['Risk_Category'] == 'Double Jeopardy').sum())
     
-    st.download_button(
-        label=f"📥 Download Double Jeopardy List ({len(dj_counties)} counties)",
-        data=dj_export.to_csv(index=False),
-        file_name="double_jeopardy_counties.csv",
-        mime="text/csv"
-    )
+    download_button(f"📥 Download Double Jeopardy List ({dj_count} counties)", 'double_jeopardy')
 
 with col2:
     st.markdown("""
@@ -134,21 +86,7 @@ with col2:
     </div>
     """, unsafe_allow_html=True)
     
-    top_severity = full_stats.nlargest(50, 'severity_score').copy()
-    severity_export = top_severity[['County', 'State', 'mean_median_aqi', 'mean_max_aqi',
-                                    'norm_median', 'norm_max', 'severity_score', 
-                                    'Risk_Category', 'Severity_Rank']]
-    severity_export.columns = ['County', 'State', 'Mean_Median_AQI', 'Mean_Max_AQI',
-                               'Norm_Chronic', 'Norm_Acute', 'Severity_Score',
-                               'Risk_Category', 'Severity_Rank']
-    severity_export = severity_export.round(3)
-    
-    st.download_button(
-        label="📥 Download Top 50 Severity List",
-        data=severity_export.to_csv(index=False),
-        file_name="top_severity_counties.csv",
-        mime="text/csv"
-    )
+    download_button("📥 Download Top 50 Severity List", 'top_severity')
 
 # Full dataset download
 section_label(st, "Full Processed Dataset")
@@ -160,20 +98,13 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-full_export = full_stats[['County', 'State', 'mean_median_aqi', 'mean_max_aqi',
-                          'norm_median', 'norm_max', 'severity_score',
-                          'Risk_Category', 'Chronic_Rank', 'Acute_Rank', 'Severity_Rank']]
-full_export.columns = ['County', 'State', 'Mean_Median_AQI', 'Mean_Max_AQI',
-                       'Norm_Chronic', 'Norm_Acute', 'Severity_Score',
-                       'Risk_Category', 'Chronic_Rank', 'Acute_Rank', 'Severity_Rank']
-full_export = full_export.sort_values('Severity_Score', ascending=False).round(3)
+col1, col2 = st.columns(2)
+
+with col1:
+    download_button(f"📥 Download Full Dataset ({len(full_stats)} counties)", 'full')
 
-st.download_button(
-    label=f"📥 Download Full Dataset ({len(full_export)} counties)",
-    data=full_export.to_csv(index=False),
-    file_name="all_county_statistics.csv",
-    mime="text/csv"
-)
+with col2:
+    download_button("📦 Download All Files (ZIP)", BUNDLE)
 
 # =============================================================================
 # METHODOLOGY SECTION
@@ -181,13 +112,13 @@ st.download_button(
 st.markdown("---")
 st.markdown("## 📐 Methodology")
 
-st.markdown("""
+st.markdown(f"""
 <div class="info-card">
 <h4 style="margin-top: 0; color: #2d3748;">Data Processing Pipeline</h4>
 <ul>
-    <li><strong>Data Source:</strong> EPA Air Quality Index Annual Summary files (2021-2024)</li>
+    <li><strong>Data Source:</strong> EPA Air Quality Index Annual Summary files ({years_label})</li>
     <li><strong>Geographic Unit:</strong> U.S. Counties</li>
-    <li><strong>Aggregation:</strong> 4-year average of annual Median AQI and Max AQI per county</li>
+    <li><strong>Aggregation:</strong> {n_years}-year average of annual Median AQI and Max AQI per county</li>
     <li><strong>Threshold Calculation:</strong> 90th percentile computed dynamically from filtered dataset</li>
 </ul>
 </div>
@@ -196,14 +127,14 @@ st.markdown("""
 col1, col2 = st.columns(2)
 
 with col1:
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-card">
     <h4 style="margin-top: 0; color: #2563eb; border-bottom: 1px solid #eff6ff; padding-bottom: 12px;">Key Metrics Defined</h4>
     <ul>
-        <li><strong>Mean Median AQI:</strong> Average of yearly Median AQI values (2021-2024). 
+        <li><strong>Mean Median AQI:</strong> Average of yearly Median AQI values ({years_label}). 
         Represents typical daily air quality—the "daily grind" of chronic exposure.</li>
         <br>
-        <li><strong>Mean Max AQI:</strong> Average of yearly Max AQI values (2021-2024). 
+        <li><strong>Mean Max AQI:</strong> Average of yearly Max AQI values ({years_label}). 
         Represents peak pollution events—acute exposure episodes like wildfires or inversions.</li>
         <br>
         <li><strong>Severity Score:</strong> (Normalized Median + Normalized Max) / 2. 
@@ -235,7 +166,7 @@ section_divider(st)
 # =============================================================================
 section_label(st, "Important Limitations")
 
-st.markdown("""
+st.markdown(f"""
 <div class="callout-box-orange">
 <p style="margin-top: 0;"><strong>This analysis has several limitations that users should consider:</strong></p>
 <ul>
@@ -246,8 +177,8 @@ st.markdown("""
     can disproportionately affect averages. We provide outlier handling options, but true values 
     reflect real exposures.</li>
     <br>
-    <li><strong>Temporal Aggregation:</strong> 4-year averages smooth out year-to-year variation. 
-    A county that dramatically improved in 2024 may still appear high-risk due to earlier years.</li>
+    <li><strong>Temporal Aggregation:</strong> {n_years}-year averages smooth out year-to-year variation. 
+    A county that dramatically improved in {available_years()[-1]} may still appear high-risk due to earlier years.</li>
     <br>
     <li><strong>Population Weighting:</strong> This analysis treats all counties equally. 
     A county with 10,000 residents counts the same as one with 10 million. 
@@ -262,9 +193,9 @@ st.markdown("""
 # =============================================================================
 # FOOTER
 # =============================================================================
-st.markdown("""
+st.markdown(f"""
 <div class="footer">
-    <p style="margin: 0 0 8px 0;"><strong>Data Source:</strong> EPA Air Quality Index Annual Summary (2021-2024)</p>
+    <p style="margin: 0 0 8px 0;"><strong>Data Source:</strong> EPA Air Quality Index Annual Summary ({years_label})</p>
     <p style="margin: 0; color: #94a3b8;"><strong>Dashboard:</strong> Datathon 2026 &nbsp;|&nbsp; Built with Streamlit + Plotly &nbsp;|&nbsp; <strong>Last Updated:</strong> February 2026</p>
 </div>
 """, unsafe_allow_html=True)
@@ -4,6 +4,9 @@ echo "\
 email = \"\"\n\
 " > ~/.streamlit/credentials.toml
 echo "\
+[global]\n\
+minCachedMessageSize = 4000\n\
+\n\
 [server]\n\
 headless = true\n\
 enableCORS=false\n\
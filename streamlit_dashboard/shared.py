@@ -0,0 +1,136 @@
+"""
+Memory-mapped arrays shared by every dashboard process on a host
+Large read-only structures (the combined AQI frame, the year cube) are
+published once per dataset version as ``.npy`` files and attached by each
+worker with ``np.load(mmap_mode='r')``. All processes then read the same
+page-cache pages instead of each parsing and holding a private copy, so
+memory per host stays flat as workers are added.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Bumped whenever the published layout changes
+SHARED_FORMAT = 1
+
+# Set AIRRISK_SHARED_DATA=0 to keep private in-process copies instead
+SHARED_ENABLED = os.environ.get('AIRRISK_SHARED_DATA', '1') != '0'
+
+META_FILE = 'meta.json'
+
+
+def shared_dir(root, version):
+    """Directory holding everything published for one dataset version."""
+    return os.path.join(root, f"shared_v{SHARED_FORMAT}_{version}")
+
+
+def _remove_stale(root, version):
+    # Processes still mapping old files keep their pages until they exit
+    current = os.path.basename(shared_dir(root, version))
+    for name in os.listdir(root):
+        if name.startswith('shared_v') and name != current and not name.endswith('.tmp'):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def publish(root, version, name, arrays, meta=None):
+    """Write ``{key: array}`` under ``name`` for ``version``, once per host.
+
+    The files are written to a private temporary directory and renamed into
+    place, so concurrent publishers never expose a partial set; the first
+    rename wins. Returns True when the arrays are (now) published.
+    """
+    if not SHARED_ENABLED:
+        return False
+    target = os.path.join(shared_dir(root, version), name)
+    if os.path.isdir(target):
+        return True
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(tmp, exist_ok=True)
+        for key, values in arrays.items():
+            np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(values), allow_pickle=False)
+        with open(os.path.join(tmp, META_FILE), 'w') as fh:
+            json.dump({**(meta or {}), 'arrays': list(arrays)}, fh)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Another worker published first
+            shutil.rmtree(tmp, ignore_errors=True)
+            return os.path.isdir(target)
+        _remove_stale(root, version)
+        return True
+    except (OSError, ValueError):
+        # Read-only deploys (or object columns) fall back to private copies
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
+
+
+def attach(root, version, name):
+    """``(arrays, meta)`` for published arrays as read-only memory maps, else None."""
+    if not SHARED_ENABLED:
+        return None
+    target = os.path.join(shared_dir(root, version), name)
+    try:
+        with open(os.path.join(target, META_FILE)) as fh:
+            meta = json.load(fh)
+        arrays = {
+            key: np.load(os.path.join(target, f"{key}.npy"), mmap_mode='r', allow_pickle=False).view(np.ndarray)
+            for key in meta['arrays']
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    return arrays, meta
+
+
+def frame_arrays(df):
+    """Split a frame into plain arrays plus the metadata to rebuild it.
+
+    Categorical columns are stored as their integer codes; object columns
+    cannot be memory-mapped and raise ValueError.
+    """
+    arrays, columns = {}, []
+    for i, (name, column) in enumerate(df.items()):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            arrays[f"c{i}"] = column.array.codes
+            columns.append({
+                'name': name,
+                'categories': column.cat.categories.tolist(),
+                'ordered': bool(column.cat.ordered),
+            })
+        else:
+            values = column.to_numpy()
+            if values.dtype == object:
+                raise ValueError(f"Column {name!r} cannot be shared")
+            arrays[f"c{i}"] = values
+            columns.append({'name': name})
+    return arrays, {'columns': columns}
+
+
+def frame_from_arrays(arrays, meta):
+    """Frame whose columns are views of ``arrays`` (no copy)."""
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        values = arrays[f"c{i}"]
+        if 'categories' in column:
+            dtype = pd.CategoricalDtype(column['categories'], ordered=column['ordered'])
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def publish_frame(root, version, name, df):
+    try:
+        arrays, meta = frame_arrays(df)
+    except ValueError:
+        return False
+    return publish(root, version, name, arrays, meta)
+
+
+def attach_frame(root, version, name):
+    """Published frame backed by shared memory maps, or None."""
+    shared = attach(root, version, name)
+    return None if shared is None else frame_from_arrays(*shared)
@@ -3,6 +3,11 @@ Shared CSS styles for the AQI Dashboard
 All pages should import and apply these styles for consistency
 """
 
+import re
+
+# name -> minified <style> block, built once per process
+_stylesheets = {}
+
 SHARED_CSS = """
 <style>
     /* Import Inter font */
@@ -433,10 +438,373 @@ SHARED_CSS = """
 </style>
 """
 
+# Overview page theme (AirRisk.py)
+OVERVIEW_CSS = """
+<style>
+    /* ========== GLOBAL STYLES ========== */
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+    
+    .stApp {
+        background: linear-gradient(180deg, #f8fafc 0%, #f1f5f9 100%);
+        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
+    }
+    
+    /* Hide Streamlit branding */
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    
+    /* ========== TYPOGRAPHY ========== */
+    h1 {
+        color: #0f172a;
+        font-weight: 700;
+        font-size: 2.25rem !important;
+        letter-spacing: -0.025em;
+        margin-bottom: 0.5rem !important;
+        line-height: 1.2;
+    }
+    
+    h2 {
+        color: #1e293b;
+        font-weight: 600;
+        font-size: 1.5rem !important;
+        letter-spacing: -0.01em;
+        margin-top: 2rem !important;
+        margin-bottom: 1rem !important;
+    }
+    
+    h3 {
+        color: #334155;
+        font-weight: 600;
+        font-size: 1.125rem !important;
+        margin-top: 1.5rem !important;
+        margin-bottom: 0.75rem !important;
+    }
+    
+    h4 {
+        color: #475569;
+        font-weight: 600;
+        font-size: 1rem !important;
+    }
+    
+    p, li {
+        color: #475569;
+        font-size: 0.95rem;
+        line-height: 1.6;
+    }
+    
+    /* ========== METRIC CARDS ========== */
+    div[data-testid="metric-container"] {
+        background: white;
+        border: 1px solid #e2e8f0;
+        border-radius: 16px;
+        padding: 20px 24px;
+        box-shadow: 0 1px 3px rgba(0,0,0,0.04), 0 4px 12px rgba(0,0,0,0.03);
+        transition: box-shadow 0.2s ease, transform 0.2s ease;
+    }
+    
+    div[data-testid="metric-container"]:hover {
+        box-shadow: 0 4px 12px rgba(0,0,0,0.08), 0 8px 24px rgba(0,0,0,0.04);
+        transform: translateY(-1px);
+    }
+    
+    div[data-testid="metric-container"] label {
+        color: #64748b;
+        font-size: 0.8rem;
+        font-weight: 500;
+        text-transform: uppercase;
+        letter-spacing: 0.05em;
+    }
+    
+    div[data-testid="metric-container"] div[data-testid="stMetricValue"] {
+        color: #0f172a;
+        font-weight: 700;
+        font-size: 1.75rem !important;
+    }
+    
+    div[data-testid="metric-container"] div[data-testid="stMetricDelta"] {
+        font-size: 0.8rem;
+    }
+    
+    /* ========== CARDS & CONTAINERS ========== */
+    .info-card {
+        background: white;
+        border-radius: 16px;
+        padding: 28px 32px;
+        border: 1px solid #e2e8f0;
+        box-shadow: 0 1px 3px rgba(0,0,0,0.04), 0 4px 12px rgba(0,0,0,0.03);
+        margin-bottom: 20px;
+    }
+    
+    .info-card h4 {
+        margin-top: 0 !important;
+        margin-bottom: 16px !important;
+        padding-bottom: 12px;
+        border-bottom: 1px solid #f1f5f9;
+    }
+    
+    .callout-box {
+        background: linear-gradient(135deg, #eff6ff 0%, #f0fdf4 100%);
+        border-left: 4px solid #3b82f6;
+        border-radius: 0 16px 16px 0;
+        padding: 24px 28px;
+        margin: 20px 0;
+        box-shadow: 0 1px 2px rgba(0,0,0,0.02);
+    }
+    
+    .callout-box strong {
+        color: #1e40af;
+    }
+    
+    .warning-box {
+        background: linear-gradient(135deg, #fff7ed 0%, #fef2f2 100%);
+        border-left: 4px solid #f97316;
+        border-radius: 0 16px 16px 0;
+        padding: 24px 28px;
+        margin: 20px 0;
+    }
+    
+    .warning-box strong {
+        color: #c2410c;
+    }
+    
+    /* ========== SIDEBAR ========== */
+    section[data-testid="stSidebar"] {
+        background: linear-gradient(180deg, #0f172a 0%, #1e293b 100%);
+        border-right: 1px solid #334155;
+    }
+    
+    section[data-testid="stSidebar"] .stMarkdown {
+        color: #e2e8f0;
+    }
+    
+    section[data-testid="stSidebar"] h2 {
+        color: white !important;
+        font-size: 1.25rem !important;
+    }
+    
+    section[data-testid="stSidebar"] hr {
+        border-color: #334155;
+        margin: 1.5rem 0;
+    }
+    
+    /* Sidebar navigation text styling */
+    section[data-testid="stSidebar"] p {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stMarkdown p {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] div[data-testid="stMarkdownContainer"] p {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] span {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stSelectbox label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stMultiSelect label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stSlider label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stRadio label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stCheckbox label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stTextInput label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stNumberInput label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stDateInput label {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] .stTimeInput label {
+        color: white !important;
+    }
+    
+    /* Sidebar navigation links and all text */
+    section[data-testid="stSidebar"] a {
+        color: white !important;
+        text-decoration: none !important;
+    }
+    
+    section[data-testid="stSidebar"] a:hover {
+        color: #fbbf24 !important;
+        text-decoration: none !important;
+    }
+    
+    section[data-testid="stSidebar"] a:visited {
+        color: white !important;
+    }
+    
+    section[data-testid="stSidebar"] a:active {
+        color: white !important;
+    }
+    
+    /* Force all sidebar text to be white */
+    section[data-testid="stSidebar"] * {
+        color: white !important;
+    }
+    
+    /* Exception for form inputs which should remain readable */
+    section[data-testid="stSidebar"] input,
+    section[data-testid="stSidebar"] select,
+    section[data-testid="stSidebar"] option {
+        color: black !important;
+    }
+    
+    /* Rename 'app' to 'AirRisk' in sidebar navigation */
+    section[data-testid="stSidebar"] a[href="/"] span {
+        font-size: 0 !important;
+        color: transparent !important;
+    }
+    
+    section[data-testid="stSidebar"] a[href="/"] span:after {
+        content: "AirRisk";
+        font-size: 0.9rem !important;
+        color: white !important;
+        font-weight: 500;
+        display: inline-block;
+        line-height: normal;
+    }
+    
+    section[data-testid="stSidebar"] li:first-child a span {
+        font-size: 0 !important;
+        color: transparent !important;
+    }
+    
+    section[data-testid="stSidebar"] li:first-child a span:after {
+        content: "AirRisk";
+        font-size: 0.9rem !important;
+        color: white !important;
+        font-weight: 500;
+        display: inline-block;
+        line-height: normal;
+    }
+    
+    /* ========== FORM ELEMENTS ========== */
+    .stSelectbox > div > div {
+        border-radius: 10px;
+        border-color: #e2e8f0;
+        background: white;
+    }
+    
+    .stSelectbox > div > div:focus-within {
+        border-color: #3b82f6;
+        box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1);
+    }
+    
+    .stSlider > div > div {
+        color: #3b82f6;
+    }
+    
+    /* Slider track */
+    .stSlider [data-baseweb="slider"] {
+        margin-top: 8px;
+    }
+    
+    /* ========== EXPANDER ========== */
+    .streamlit-expanderHeader {
+        background: white;
+        border-radius: 12px;
+        border: 1px solid #e2e8f0;
+        font-weight: 500;
+    }
+    
+    .streamlit-expanderContent {
+        border: 1px solid #e2e8f0;
+        border-top: none;
+        border-radius: 0 0 12px 12px;
+        background: white;
+    }
+    
+    /* ========== DATAFRAME ========== */
+    .stDataFrame {
+        border-radius: 12px;
+        overflow: hidden;
+        border: 1px solid #e2e8f0;
+    }
+    
+    /* ========== FOOTER ========== */
+    .footer {
+        text-align: center;
+        padding: 32px 24px;
+        color: #64748b;
+        font-size: 0.85rem;
+        border-top: 1px solid #e2e8f0;
+        margin-top: 64px;
+        background: white;
+        border-radius: 16px 16px 0 0;
+    }
+    
+    .footer strong {
+        color: #475569;
+    }
+    
+    /* ========== SECTION DIVIDER ========== */
+    .section-divider {
+        height: 1px;
+        background: linear-gradient(90deg, transparent 0%, #e2e8f0 20%, #e2e8f0 80%, transparent 100%);
+        margin: 32px 0;
+    }
+    
+    /* ========== PLOTLY CHART CONTAINER ========== */
+    .stPlotlyChart {
+        background: white;
+        border-radius: 16px;
+        padding: 16px;
+        border: 1px solid #e2e8f0;
+        box-shadow: 0 1px 3px rgba(0,0,0,0.04);
+    }
+</style>
+"""
+
+
+def minify_css(css):
+    """``css`` without comments and with whitespace collapsed (same rules)."""
+    css = re.sub(r"/\*.*?\*/", '', css, flags=re.S)
+    css = re.sub(r"\s+", ' ', css)
+    return re.sub(r"\s*([{};])\s*", r"\1", css).strip()
+
+
+def apply_stylesheet(st, name, css):
+    """Inject ``css`` inline, minified once per process.
+
+    Inline ``<style>`` is the one delivery every supported Streamlit serves
+    correctly: ``/app/static`` sends ``.css`` files as ``text/plain`` with
+    ``nosniff`` on some versions, and browsers then drop a linked stylesheet.
+    The block is byte-identical on every rerun, so with
+    ``global.minCachedMessageSize`` below its size (see config.toml) the
+    browser keeps it and reruns send only the element's hash.
+    """
+    block = _stylesheets.get(name)
+    if block is None:
+        block = _stylesheets[name] = minify_css(css)
+    st.markdown(block, unsafe_allow_html=True)
+
 
 def apply_shared_styles(st):
     """Apply shared CSS styles to the page."""
-    st.markdown(SHARED_CSS, unsafe_allow_html=True)
+    apply_stylesheet(st, 'shared', SHARED_CSS)
 
 
 def page_header(st, title, subtitle=None, icon=""):
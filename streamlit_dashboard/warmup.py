@@ -0,0 +1,228 @@
+"""
+Boot-time warm-up for the AQI Dashboard
+Builds the columnar cache, the shared dataset and year cube, the common
+threshold tables, the most common engine results and every page's default
+figures, so the first visitor after a deploy or restart is served like any
+other.
+
+    python warmup.py                  # warm persistent artifacts, then exit
+    python warmup.py --serve [ARGS]   # run the dashboard in this process
+                                      # (ARGS go to streamlit) and warm it
+                                      # on a background thread
+
+With ``--serve`` Streamlit binds its port straight away (platforms such as
+Heroku fail a boot that takes too long to bind), and the in-memory caches
+(engine results, figures) fill in the very process that serves requests.
+``ready.json`` in ``CACHE_DIR`` records the warmed dataset version, the time
+each step took, the step that failed, if any, and what each result cache
+holds (``cache.cache_report``).
+"""
+
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+from analytics import THRESHOLD_CACHE_SIZE, get_rank_index, get_threshold_table, get_year_cube
+from cache import cache_report
+from charts import (build_acute_chart, build_chronic_chart, build_profile_scatter,
+                    build_risk_pie, build_severity_bar, build_severity_chart,
+                    with_outlier_display)
+from data import CACHE_DIR, DASHBOARD_DIR, county_dimension, dataset_version, load_data
+from engine import TOP_N_SOURCES, get_engine
+from figures import cached_figure
+
+MAIN_SCRIPT = os.path.join(DASHBOARD_DIR, 'AirRisk.py')
+READY_FILE = os.path.join(CACHE_DIR, 'ready.json')
+
+# Percentiles precomputed beyond the default 90th
+COMMON_PERCENTILES = (90, 95)
+
+# Threshold tables built at boot; half the table cache, so live traffic
+# does not start by evicting what was just warmed
+THRESHOLD_WARM_LIMIT = THRESHOLD_CACHE_SIZE // 2
+
+# Default Top N slider values of the chart pages
+PAGE_TOP_N = 15
+DOUBLE_JEOPARDY_TOP_N = 10
+
+_ready = threading.Event()
+
+# {'step': ..., 'error': ...} for the step that stopped warm-up, if any
+_failure = None
+
+# The background warm-up thread, once started
+_warm_up_thread = None
+_warm_up_lock = threading.Lock()
+
+
+def common_threshold_scopes():
+    """``(year_min, year_max, state)`` scopes, most requested first.
+
+    The default national range, each state over all years, then national
+    ranges ending at the latest year (the year slider's usual moves).
+    """
+    years = [int(year) for year in get_year_cube().years]
+    yield None, None, None
+    for state in sorted(get_rank_index().counties_by_state):
+        yield None, None, state
+    for year_min in reversed(years[1:]):
+        yield year_min, years[-1], None
+
+
+def _warm_thresholds():
+    """Threshold tables for the most common scopes, up to ``THRESHOLD_WARM_LIMIT``."""
+    for scope in itertools.islice(common_threshold_scopes(), THRESHOLD_WARM_LIMIT):
+        get_threshold_table(*scope)
+
+
+def _warm_engine():
+    """Default-scope results behind every page, nationally and for all states at once."""
+    engine = get_engine()
+    any_state = next(iter(get_rank_index().counties_by_state), None)
+    for percentile in COMMON_PERCENTILES:
+        engine.exports(percentile=percentile)
+    for state in (None, any_state):
+        engine.severity(state=state)
+        engine.vulnerability_profile(state=state)
+    for metric in TOP_N_SOURCES:
+        engine.ordering(metric)
+
+
+def _warm_figures():
+    """Each page's figures for its default view (all states, default sliders).
+
+    Built from the same engine results and inputs the pages pass to
+    ``cached_figure``, so their first render is a cache hit. The drilldown
+    trend depends on the chosen county and is left to the first visit.
+    """
+    engine = get_engine()
+
+    stats_with_risk = engine.double_jeopardy()[0]
+    risk_counts = stats_with_risk['Risk_Category'].value_counts()
+    cached_figure('risk_distribution', build_risk_pie, risk_counts[risk_counts > 0])
+
+    chronic_top = engine.top_n('mean_median_aqi', PAGE_TOP_N)
+    cached_figure('chronic_top', build_chronic_chart, chronic_top, top_n=PAGE_TOP_N)
+
+    acute_top = with_outlier_display(engine.top_n('mean_max_aqi', PAGE_TOP_N), "None", engine.county_stats())
+    cached_figure('acute_top', build_acute_chart, acute_top, top_n=PAGE_TOP_N)
+
+    top_counties = engine.top_n('severity_score', DOUBLE_JEOPARDY_TOP_N, source='vulnerability_profile')
+    cached_figure('severity_bar', build_severity_bar, top_counties.iloc[::-1], top_n=DOUBLE_JEOPARDY_TOP_N)
+    stats_with_scores, mean_vuln, mean_hazard = engine.vulnerability_profile()
+    cached_figure(
+        'vulnerability_profile', build_profile_scatter,
+        stats_with_scores[['county_id', 'vulnerability_score', 'hazard_score', 'risk_category']],
+        mean_vuln=mean_vuln, mean_hazard=mean_hazard
+    )
+
+    severity_top = engine.top_n('severity_score', PAGE_TOP_N)
+    cached_figure('severity_top', build_severity_chart, severity_top, top_n=PAGE_TOP_N)
+
+
+def _write_ready_file(info):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{READY_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(info, fh, indent=2)
+        os.replace(tmp_path, READY_FILE)
+    except OSError:
+        pass
+
+
+def warm_up(figures=False, log=None):
+    """Precompute everything a first request would need; returns step timings.
+
+    ``figures`` also builds every page's default figures (only useful in the
+    process that serves the dashboard). A step that raises stops warm-up: it
+    is printed to stderr with its traceback, recorded (see
+    ``warm_up_failure``) and the process still becomes ready, serving cold.
+    Safe to call from several threads: the underlying caches coalesce
+    concurrent builds.
+    """
+    global _failure
+    steps = [
+        ('dataset', load_data),
+        ('county_dimension', county_dimension),
+        ('year_cube', get_year_cube),
+        ('rank_index', get_rank_index),
+        ('threshold_tables', _warm_thresholds),
+        ('engine', _warm_engine),
+    ]
+    if figures:
+        steps.append(('figures', _warm_figures))
+
+    timings = {}
+    failure = None
+    try:
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:
+                failure = {'step': name, 'error': f"{type(exc).__name__}: {exc}"}
+                print(f"warm-up: {name} failed, serving without the remaining steps", file=sys.stderr)
+                traceback.print_exc()
+                break
+            timings[name] = round(time.perf_counter() - start, 3)
+            if log:
+                log(f"warm-up: {name} {timings[name]:.3f}s")
+    finally:
+        _failure = failure
+        caches = cache_report()
+        if log:
+            log(f"warm-up: caches hold {caches['total']['bytes'] / 2 ** 20:.1f} MiB "
+                f"of the {caches['total']['budget_bytes'] / 2 ** 20:.0f} MiB budget")
+        _write_ready_file({'dataset_version': dataset_version(), 'pid': os.getpid(),
+                           'finished_at': time.time(), 'timings': timings, 'failed': failure,
+                           'caches': caches})
+        _ready.set()
+    return timings
+
+
+def warm_up_in_background(figures=False, log=None):
+    """Start ``warm_up`` on a background thread, once per process (for
+    servers that cannot block at boot); returns the thread.
+
+    The thread is not a daemon: interpreter exit waits for it instead of
+    killing it halfway through writing cache files.
+    """
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=warm_up, kwargs={'figures': figures, 'log': log},
+                                               name='airrisk-warmup')
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def is_ready():
+    """True once this process has finished warming up (or given up on a failed step)."""
+    return _ready.is_set()
+
+
+def warm_up_failure():
+    """``{'step', 'error'}`` of the step that stopped warm-up, else None."""
+    return _failure
+
+
+def serve(streamlit_args):
+    """Run the dashboard in this process via Streamlit's CLI, warming it on a
+    background thread so the server binds its port straight away."""
+    from streamlit.web import cli
+
+    warm_up_in_background(figures=True, log=print)
+    sys.argv = ['streamlit', 'run', MAIN_SCRIPT, *streamlit_args]
+    sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--serve']:
+        serve(sys.argv[2:])
+    else:
+        warm_up(log=print)
@@ -0,0 +1,11 @@
+"""
+Shared pytest setup: the dashboard and API modules are imported by their
+top-level names, as the Streamlit pages and api/index.py do.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'streamlit_dashboard'))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
@@ -0,0 +1,95 @@
+"""JSON API: ETags, conditional requests and error responses."""
+
+import os
+import subprocess
+import sys
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+import index as api
+
+API_DIR = os.path.dirname(api.__file__)
+
+
+def call(path, method='GET', if_none_match=None):
+    environ = {}
+    setup_testing_defaults(environ)
+    environ['REQUEST_METHOD'] = method
+    environ['PATH_INFO'], _, environ['QUERY_STRING'] = path.partition('?')
+    if if_none_match is not None:
+        environ['HTTP_IF_NONE_MATCH'] = if_none_match
+    response = {}
+
+    def start_response(status, headers):
+        response['status'] = int(status.split()[0])
+        response['headers'] = dict(headers)
+
+    response['body'] = b''.join(api.app(environ, start_response))
+    return response
+
+
+def test_import_starts_no_threads():
+    # A fresh interpreter: this one has already served requests
+    code = "import threading, index; print(threading.active_count())"
+    result = subprocess.run([sys.executable, '-c', code], cwd=API_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '1'
+
+
+def test_ok_response_carries_etag_and_cache_control():
+    response = call('/api/stats?state=Ohio')
+    assert response['status'] == 200
+    assert response['headers']['ETag'].startswith('"')
+    assert response['headers']['Cache-Control'] == api.CACHE_CONTROL
+
+
+def test_equivalent_queries_share_an_etag():
+    first = call('/api/thresholds?percentile=090&state=All+States')
+    second = call('/api/thresholds?percentile=90')
+    assert first['headers']['ETag'] == second['headers']['ETag']
+
+
+@pytest.mark.parametrize('if_none_match', ['{etag}', 'W/{etag}', '"other", {etag}', '*'])
+def test_matching_if_none_match_gets_304(if_none_match):
+    etag = call('/api/severity?n=5')['headers']['ETag']
+    response = call('/api/severity?n=5', if_none_match=if_none_match.format(etag=etag))
+    assert response['status'] == 304
+    assert response['body'] == b''
+    assert 'Content-Type' not in response['headers']
+
+
+def test_stale_etag_gets_the_body():
+    response = call('/api/severity?n=5', if_none_match='"stale"')
+    assert response['status'] == 200
+    assert response['body']
+
+
+@pytest.mark.parametrize('path, status', [
+    ('/api/stats?year_min=abc', 400),
+    ('/api/stats?year_min=1900', 400),
+    ('/api/classification?category=Nope', 400),
+    ('/api/stats?state=Atlantis', 404),
+    ('/api/drilldown?state=Ohio&county=Nowhere', 404),
+    ('/api/drilldown', 400),
+    ('/api/nope', 404),
+])
+def test_errors_are_never_turned_into_304(path, status):
+    for if_none_match in (None, '*'):
+        response = call(path, if_none_match=if_none_match)
+        assert response['status'] == status
+        assert response['headers']['Cache-Control'] == api.NO_STORE
+        assert 'ETag' not in response['headers']
+        assert b'error' in response['body']
+
+
+def test_other_methods_are_rejected():
+    response = call('/api/stats', method='POST')
+    assert response['status'] == 405
+    assert response['headers']['Allow'] == 'GET, HEAD'
+
+
+def test_health_is_never_cached():
+    response = call('/api/health', if_none_match='*')
+    assert response['status'] == 200
+    assert response['headers']['Cache-Control'] == api.NO_STORE
+    assert 'ETag' not in response['headers']
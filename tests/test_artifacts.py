@@ -0,0 +1,100 @@
+"""ArtifactStore persistence and the pipeline's invalidation rules."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from analytics import YearCube
+from artifacts import ArtifactStore
+from data import CountyDimension, load_data
+from engine import AnalyticsEngine
+
+
+def frame(*values):
+    return pd.DataFrame({'value': list(values)})
+
+
+def test_artifacts_survive_a_restart(tmp_path):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return frame(1.0, 2.0), {'threshold': 3.5}
+
+    first = ArtifactStore(str(tmp_path)).get_or_compute('stage', ['input'], {'p': 1}, compute)
+    restarted = ArtifactStore(str(tmp_path))
+    second = restarted.get_or_compute('stage', ['input'], {'p': 1}, compute)
+    assert len(calls) == 1
+    assert restarted.info()['loaded'] == 1
+    assert second.digest == first.digest
+    assert second.meta == {'threshold': 3.5}
+    pd.testing.assert_frame_equal(second.frame, first.frame)
+
+
+@pytest.mark.parametrize('stage, inputs, params', [
+    ('other', ['input'], {'p': 1}),
+    ('stage', ['changed'], {'p': 1}),
+    ('stage', ['input'], {'p': 2}),
+])
+def test_any_changed_key_part_recomputes(tmp_path, stage, inputs, params):
+    store = ArtifactStore(str(tmp_path))
+    base = store.get_or_compute('stage', ['input'], {'p': 1}, lambda: (frame(1.0), {}))
+    changed = store.get_or_compute(stage, inputs, params, lambda: (frame(2.0), {}))
+    assert changed.digest != base.digest
+    assert store.info()['computed'] == 2
+
+
+def test_read_only_store_still_serves_artifacts(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path))
+    store.get_or_compute('stage', [], {}, lambda: (frame(1.0), {}))
+
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only file system")
+
+    monkeypatch.setattr(os, 'utime', read_only)
+    store.get_or_compute('stage', [], {}, lambda: pytest.fail("recomputed"))
+    assert store.info()['loaded'] == 1
+
+
+def test_unwritable_frames_are_returned_without_persisting(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    mixed = pd.DataFrame({'value': [1, 'a', 2.5]})
+    artifact = store.get_or_compute('stage', [], {}, lambda: (mixed, {}))
+    assert artifact.frame is mixed
+    assert store.info()['saved'] == 0
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture(scope='module')
+def engine(tmp_path_factory):
+    return AnalyticsEngine(artifacts=ArtifactStore(str(tmp_path_factory.mktemp('artifacts'))))
+
+
+def test_percentile_change_reuses_the_aggregation(engine):
+    store = engine.artifacts
+    engine.double_jeopardy(percentile=90)
+    aggregate = engine._aggregate()
+    computed = store.info()['computed']
+
+    engine.double_jeopardy(percentile=95)
+    assert store.info()['computed'] == computed + 1
+    assert engine._aggregate().digest == aggregate.digest
+
+
+def test_new_year_file_keeps_aggregates_of_other_ranges():
+    # The last year's file adds counties: compare the aggregate inputs of the
+    # earlier years with and without it
+    df = load_data()
+    last = int(df['Year'].max())
+    earlier = df[df['Year'] < last]
+
+    def aggregate_key(rows):
+        dimension = CountyDimension.from_frame(rows)
+        cube = YearCube.from_frame(rows.assign(county_id=dimension.ids_for_frame(rows)), dimension)
+        return len(dimension), dimension.rows_digest(cube.present(int(rows['Year'].min()), last - 1))
+
+    with_new_year, key_with = aggregate_key(df)
+    without_new_year, key_without = aggregate_key(earlier)
+    assert with_new_year > without_new_year
+    assert key_with == key_without
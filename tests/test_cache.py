@@ -0,0 +1,72 @@
+"""BoundedCache eviction policies, byte budget and reporting."""
+
+import numpy as np
+
+from cache import BoundedCache, cache_budget, cache_report
+
+
+def fill(cache, keys, value=None):
+    for key in keys:
+        cache.get_or_compute(key, lambda key=key: key if value is None else value)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = BoundedCache(3)
+    fill(cache, 'abc')
+    fill(cache, 'a')
+    fill(cache, 'd')
+    assert sorted(cache._entries) == ['a', 'c', 'd']
+    assert cache.info()['evictions'] == 1
+
+
+def test_lfu_evicts_least_often_hit():
+    cache = BoundedCache(3, policy='lfu')
+    fill(cache, 'abc')
+    fill(cache, 'aaabb')
+    fill(cache, 'd')
+    assert sorted(cache._entries) == ['a', 'b', 'd']
+
+
+def test_lfu_never_evicts_the_entry_just_stored():
+    cache = BoundedCache(2, policy='lfu')
+    fill(cache, 'ab')
+    fill(cache, 'aabb')
+    fill(cache, 'c')
+    assert 'c' in cache._entries
+
+
+def test_lfu_counts_age_so_stale_entries_are_evicted():
+    cache = BoundedCache(4, policy='lfu')
+    old = [('v1', key) for key in 'ab']
+    fill(cache, old * 50)
+    for i in range(200):
+        fill(cache, [('v2', 'x'), ('v2', 'y'), ('v2', f'z{i % 3}')])
+    assert not set(old) & set(cache._entries)
+    assert cache.info()['agings'] > 0
+
+
+def test_byte_budget_evicts_and_rejects_oversized_values():
+    array = np.zeros(1000)
+    cache = BoundedCache(100, max_bytes=3 * array.nbytes)
+    fill(cache, range(5), array)
+    assert len(cache) <= 3
+    assert cache.info()['bytes'] <= cache.max_bytes
+
+    value = cache.get_or_compute('huge', lambda: np.zeros(10_000))
+    assert len(value) == 10_000
+    assert 'huge' not in cache._entries
+    assert cache.info()['rejected'] == 1
+
+
+
+def test_cache_report_lists_named_caches_and_largest_entries():
+    cache = BoundedCache(8, name='test_report')
+    cache.get_or_compute('small', lambda: np.zeros(10))
+    cache.get_or_compute('large', lambda: np.zeros(1000))
+
+    report = cache_report(entries=1)
+    assert report['test_report']['entries'] == 2
+    assert [row['key'] for row in report['test_report']['largest']] == ["'large'"]
+    assert report['total']['bytes'] >= cache.info()['bytes']
+    assert report['total']['budget_bytes'] == cache_budget(1.0)
+    assert 'largest' not in cache_report()['test_report']
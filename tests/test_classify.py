@@ -0,0 +1,51 @@
+"""Vectorised risk classifier codes and labels."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import (DOUBLE_JEOPARDY, HIGH_ACUTE, HIGH_CHRONIC, LOW_RISK, RISK_LABELS,
+                       classify_risk, risk_labels, scope_county_stats)
+
+
+def notebook_labels(stats, chronic_threshold, acute_threshold):
+    """The original sequential .loc assignments the classifier replaced."""
+    labels = pd.Series('Low Risk', index=stats.index)
+    labels[stats['mean_median_aqi'] >= chronic_threshold] = 'High Chronic'
+    labels[stats['mean_max_aqi'] >= acute_threshold] = 'High Acute'
+    labels[(stats['mean_median_aqi'] >= chronic_threshold) &
+           (stats['mean_max_aqi'] >= acute_threshold)] = 'Double Jeopardy'
+    return labels
+
+
+def test_codes_for_each_quadrant_and_the_boundary():
+    chronic = [10, 50, 10, 50, 40]
+    acute = [100, 100, 300, 300, 200]
+    codes = classify_risk(chronic, acute, 40, 200)
+    assert codes.tolist() == [LOW_RISK, HIGH_CHRONIC, HIGH_ACUTE, DOUBLE_JEOPARDY, DOUBLE_JEOPARDY]
+    assert codes.dtype == np.int8
+    assert [RISK_LABELS[code] for code in codes] == [
+        'Low Risk', 'High Chronic', 'High Acute', 'Double Jeopardy', 'Double Jeopardy']
+
+
+def test_threshold_arrays_classify_every_level_in_one_pass():
+    chronic = np.array([10.0, 50.0, 30.0])
+    acute = np.array([100.0, 300.0, 250.0])
+    chronic_thresholds = np.array([5.0, 30.0, 60.0])
+    acute_thresholds = np.array([50.0, 250.0, 400.0])
+    codes = classify_risk(chronic, acute, chronic_thresholds, acute_thresholds)
+    assert codes.shape == (3, 3)
+    for level in range(3):
+        expected = classify_risk(chronic, acute, chronic_thresholds[level], acute_thresholds[level])
+        np.testing.assert_array_equal(codes[level], expected)
+
+
+@pytest.mark.parametrize('percentile', [80, 90, 95, 99])
+def test_labels_match_the_notebook_assignments(percentile):
+    stats = scope_county_stats()
+    chronic_threshold = stats['mean_median_aqi'].quantile(percentile / 100)
+    acute_threshold = stats['mean_max_aqi'].quantile(percentile / 100)
+    codes = classify_risk(stats['mean_median_aqi'], stats['mean_max_aqi'], chronic_threshold, acute_threshold)
+    labels = risk_labels(codes)
+    assert list(labels.categories) == RISK_LABELS
+    assert list(labels.astype(str)) == list(notebook_labels(stats, chronic_threshold, acute_threshold))
@@ -0,0 +1,76 @@
+"""Headless CLI: files written, summary contents and argument errors."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import airrisk_cli
+from data import available_years
+from exports import export_bytes
+
+
+def run(*argv):
+    airrisk_cli.main(['compute', *argv])
+
+
+def test_default_run_writes_the_dashboard_exports(tmp_path, capsys):
+    run('--out', str(tmp_path))
+    names = sorted(os.listdir(tmp_path))
+    assert names == ['all_county_statistics.csv', 'double_jeopardy_counties.csv',
+                     'summary.json', 'top_severity_counties.csv']
+    assert (tmp_path / 'all_county_statistics.csv').read_bytes() == export_bytes('full', 'csv')
+
+    summary = json.loads((tmp_path / 'summary.json').read_text())
+    years = available_years()
+    assert summary['years'] == [years[0], years[-1]]
+    assert summary['state'] == 'All States'
+    assert sum(summary['risk_categories'].values()) == summary['counties']
+    assert 'Double Jeopardy' in capsys.readouterr().out
+
+
+def test_scope_formats_and_bundle(tmp_path):
+    year = available_years()[-1]
+    run('--years', str(year), '--state', 'California', '--percentile', '95',
+        '--format', 'csv.gz', '--bundle', '--out', str(tmp_path))
+    names = sorted(os.listdir(tmp_path))
+    assert 'airrisk_exports_csv_gz.zip' in names
+    assert 'all_county_statistics.csv.gz' in names
+
+    summary = json.loads((tmp_path / 'summary.json').read_text())
+    assert summary['years'] == [year, year]
+    assert summary['state'] == 'California'
+    assert summary['percentile'] == 95
+    assert sorted(summary['files']) == [name for name in names if name != 'summary.json']
+
+
+@pytest.mark.parametrize('argv', [
+    ['--years', '2025-2021'],
+    ['--years', 'recent'],
+    ['--percentile', '101'],
+    ['--format', 'xlsx'],
+])
+def test_invalid_arguments_exit_with_usage_error(tmp_path, argv):
+    with pytest.raises(SystemExit) as exc:
+        run(*argv, '--out', str(tmp_path))
+    assert exc.value.code == 2
+
+
+def test_years_outside_the_data_are_rejected(tmp_path):
+    with pytest.raises(SystemExit) as exc:
+        run('--years', '1990-1991', '--out', str(tmp_path))
+    assert 'must lie within' in str(exc.value.code)
+
+
+def test_runs_without_importing_streamlit(tmp_path):
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]); import airrisk_cli; "
+        "airrisk_cli.main(['compute', '--out', sys.argv[2]]); print('streamlit' in sys.modules)"
+    )
+    out = subprocess.run(
+        [sys.executable, '-c', script, os.path.dirname(airrisk_cli.__file__), str(tmp_path)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    assert out.strip().splitlines()[-1] == 'False'
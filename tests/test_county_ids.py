@@ -0,0 +1,65 @@
+"""County ids: real FIPS codes, stable across the set of year files."""
+
+import pandas as pd
+import pytest
+
+from data import NON_FIPS_COUNTY_START, CountyDimension, _county_key, county_dimension, load_data
+
+
+@pytest.fixture(scope='module')
+def dimension():
+    return county_dimension()
+
+
+@pytest.mark.parametrize('state, county, fips', [
+    ('Alabama', 'DeKalb', 1049),
+    ('Alabama', 'Baldwin', 1003),
+    ('Iowa', 'Webster', 19187),
+    ('Kansas', 'Douglas', 20045),
+    ('Missouri', 'Saint Louis', 29189),
+    ('Missouri', 'St. Louis City', 29510),
+    ('Maryland', 'Baltimore (City)', 24510),
+    ('New Mexico', 'Dona Ana', 35013),
+    ('Virginia', 'Charles', 51036),
+])
+def test_ids_are_county_fips_codes(dimension, state, county, fips):
+    assert dimension.county_id(state, county) == fips
+
+
+def test_ids_are_unique_and_keyed_by_state(dimension):
+    table = dimension.table
+    assert table['county_id'].is_unique
+    assert (table['county_id'] // 1000 == table['state_code']).all()
+
+
+def test_counties_without_fips_get_reserved_codes(dimension):
+    table = dimension.table
+    mexico = table[table['State'] == 'Country Of Mexico']
+    assert len(mexico) > 0
+    assert (mexico['county_id'] % 1000 >= NON_FIPS_COUNTY_START).all()
+    fips_states = table[table['state_code'] < 80]
+    assert (fips_states['county_id'] % 1000 < NON_FIPS_COUNTY_START).all()
+
+
+def test_ids_do_not_depend_on_other_years():
+    df = load_data()
+    full = CountyDimension.from_frame(df).table.set_index(['State', 'County'])['county_id']
+    earlier = CountyDimension.from_frame(df[df['Year'] < df['Year'].max()]).table
+    earlier = earlier.set_index(['State', 'County'])['county_id']
+    assert len(earlier) < len(full)
+    pd.testing.assert_series_equal(earlier, full.reindex(earlier.index))
+
+
+@pytest.mark.parametrize('epa, census', [
+    ('Saint Clair', 'St. Clair County'),
+    ('Dona Ana', 'Doña Ana County'),
+    ('Baltimore (City)', 'Baltimore city'),
+    ('Matanuska-Susitna', 'Matanuska-Susitna Borough'),
+    ('Catano', 'Cataño Municipio'),
+])
+def test_epa_names_normalize_to_census_names(epa, census):
+    assert _county_key(epa) == _county_key(census)
+
+
+def test_county_and_city_stay_distinct():
+    assert _county_key('Fairfax') != _county_key('Fairfax city')
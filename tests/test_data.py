@@ -0,0 +1,40 @@
+"""Shared data-access layer: one loader, one cached frame per process."""
+
+import ast
+import glob
+import os
+
+import pandas as pd
+
+from data import DASHBOARD_DIR, build_manifest, load_data
+
+SCRIPTS = [os.path.join(DASHBOARD_DIR, 'AirRisk.py')] + sorted(glob.glob(os.path.join(DASHBOARD_DIR, 'pages', '*.py')))
+
+
+def test_load_data_returns_one_shared_frame():
+    assert load_data() is load_data()
+
+
+def test_load_data_matches_the_year_files():
+    frames = []
+    for entry in build_manifest():
+        frame = pd.read_csv(entry.path)
+        frame['Year'] = entry.year
+        frames.append(frame)
+    expected = pd.concat(frames, ignore_index=True)
+
+    loaded = load_data().drop(columns='county_id')
+    loaded = loaded.astype({'State': str, 'County': str})
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+
+
+def test_pages_use_the_shared_loader():
+    for script in SCRIPTS:
+        with open(script, encoding='utf-8') as fh:
+            tree = ast.parse(fh.read())
+        defined = {node.name for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)}
+        imported = {alias.name for node in ast.walk(tree)
+                    if isinstance(node, ast.ImportFrom) and node.module == 'data'
+                    for alias in node.names}
+        assert 'load_data' not in defined, script
+        assert 'load_data' in imported, script
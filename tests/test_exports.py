@@ -0,0 +1,72 @@
+"""Export formats and the ZIP bundle read back to the exported frames."""
+
+import gzip
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from engine import get_engine
+from exports import (EXPORT_FILE_NAMES, EXPORTS, FORMATS, available_formats,
+                     write_bundle, write_export)
+
+
+@pytest.fixture(scope='module')
+def frames():
+    full_stats = get_engine().exports()[0]
+    return {name: make(full_stats).reset_index(drop=True) for name, make in EXPORTS.items()}
+
+
+def read_back(data, fmt):
+    if fmt == 'csv':
+        return pd.read_csv(io.BytesIO(data))
+    if fmt == 'csv.gz':
+        return pd.read_csv(io.BytesIO(gzip.decompress(data)))
+    if fmt == 'parquet':
+        return pd.read_parquet(io.BytesIO(data))
+    import pyarrow as pa
+    return pa.ipc.open_file(io.BytesIO(data)).read_pandas()
+
+
+def export(frame, fmt, chunk_rows):
+    buffer = io.BytesIO()
+    write_export(frame, fmt, buffer, chunk_rows=chunk_rows)
+    return buffer.getvalue()
+
+
+def assert_same_frame(actual, expected):
+    pd.testing.assert_frame_equal(actual.astype({'State': str, 'County': str}),
+                                  expected.astype({'State': str, 'County': str}),
+                                  check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('fmt', available_formats())
+def test_each_format_round_trips_in_chunks(frames, fmt):
+    for frame in frames.values():
+        data = export(frame, fmt, chunk_rows=100)
+        assert_same_frame(read_back(data, fmt), frame)
+        assert export(frame, fmt, chunk_rows=100) == data
+
+
+def test_chunked_csv_is_the_single_pass_csv(frames):
+    for frame in frames.values():
+        expected = frame.to_csv(index=False).encode('utf-8')
+        assert export(frame, 'csv', chunk_rows=7) == expected
+        assert export(frame, 'csv', chunk_rows=len(frame) + 1) == expected
+
+
+@pytest.mark.parametrize('fmt', available_formats())
+def test_bundle_holds_one_file_per_export(frames, fmt):
+    named = {EXPORT_FILE_NAMES[name]: frame for name, frame in frames.items()}
+    buffer = io.BytesIO()
+    write_bundle(named, fmt, buffer, chunk_rows=100)
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as archive:
+        assert sorted(archive.namelist()) == sorted(name + FORMATS[fmt][0] for name in named)
+        for file_name, frame in named.items():
+            assert_same_frame(read_back(archive.read(file_name + FORMATS[fmt][0]), fmt), frame)
+
+
+def test_unknown_format_is_rejected(frames):
+    with pytest.raises(ValueError):
+        export(frames['full'], 'xlsx', chunk_rows=100)
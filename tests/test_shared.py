@@ -0,0 +1,70 @@
+"""Memory-mapped publishing and attaching of shared arrays and frames."""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+import shared
+from data import load_data
+from shared import attach, attach_frame, publish, publish_frame, shared_dir
+
+
+def test_published_arrays_attach_as_read_only_maps(tmp_path):
+    arrays = {'counts': np.arange(12, dtype=np.float64).reshape(3, 4), 'years': np.array([2021, 2022])}
+    assert publish(str(tmp_path), 'v1', 'cube', arrays, meta={'kind': 'test'})
+
+    attached, meta = attach(str(tmp_path), 'v1', 'cube')
+    assert meta['kind'] == 'test'
+    for key, values in arrays.items():
+        np.testing.assert_array_equal(attached[key], values)
+        assert isinstance(attached[key].base, np.memmap)
+        assert not attached[key].flags.writeable
+
+
+def test_publishing_again_keeps_the_first_copy(tmp_path):
+    assert publish(str(tmp_path), 'v1', 'cube', {'a': np.zeros(3)})
+    assert publish(str(tmp_path), 'v1', 'cube', {'a': np.ones(3)})
+    np.testing.assert_array_equal(attach(str(tmp_path), 'v1', 'cube')[0]['a'], np.zeros(3))
+
+
+def test_a_new_version_removes_stale_ones(tmp_path):
+    publish(str(tmp_path), 'v1', 'cube', {'a': np.zeros(3)})
+    publish(str(tmp_path), 'v2', 'cube', {'a': np.ones(3)})
+    assert not os.path.exists(shared_dir(str(tmp_path), 'v1'))
+    assert attach(str(tmp_path), 'v1', 'cube') is None
+    assert attach(str(tmp_path), 'v2', 'cube') is not None
+
+
+def test_dataset_frame_round_trips(tmp_path):
+    df = load_data()
+    assert publish_frame(str(tmp_path), 'v1', 'frame', df)
+    pd.testing.assert_frame_equal(attach_frame(str(tmp_path), 'v1', 'frame'), df)
+
+
+def test_object_columns_are_not_shared(tmp_path):
+    df = pd.DataFrame({'name': ['a', 'b'], 'value': [1, 2]})
+    assert not publish_frame(str(tmp_path), 'v1', 'frame', df)
+    assert attach_frame(str(tmp_path), 'v1', 'frame') is None
+
+
+def test_sharing_can_be_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, 'SHARED_ENABLED', False)
+    assert not publish(str(tmp_path), 'v1', 'cube', {'a': np.zeros(3)})
+    assert attach(str(tmp_path), 'v1', 'cube') is None
+
+
+def test_another_process_attaches_the_same_arrays(tmp_path):
+    values = np.random.default_rng(0).random(1000)
+    publish(str(tmp_path), 'v1', 'cube', {'values': values})
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]); from shared import attach; "
+        "print(repr(float(attach(sys.argv[2], 'v1', 'cube')[0]['values'].sum())))"
+    )
+    out = subprocess.run(
+        [sys.executable, '-c', script, os.path.dirname(shared.__file__), str(tmp_path)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    assert float(out) == float(values.sum())
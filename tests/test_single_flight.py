@@ -0,0 +1,101 @@
+"""Single-flight coalescing of identical concurrent computations."""
+
+import threading
+import time
+from functools import lru_cache
+
+from cache import BoundedCache, SingleFlight, coalesced
+
+WORKERS = 8
+
+
+def run_concurrently(target, n=WORKERS):
+    """Call ``target()`` from ``n`` threads released at once; returns results or exceptions."""
+    start = threading.Barrier(n)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        start.wait()
+        try:
+            result = target()
+        except Exception as error:
+            result = error
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow(calls, value='value', delay=0.05):
+    def compute():
+        calls.append(1)
+        time.sleep(delay)
+        return value
+    return compute
+
+
+def test_concurrent_calls_for_one_key_compute_once():
+    flight = SingleFlight()
+    calls = []
+    results = run_concurrently(lambda: flight.do('key', slow(calls)))
+    assert results == ['value'] * WORKERS
+    assert len(calls) == 1
+    assert flight.info() == {'calls': 1, 'coalesced': WORKERS - 1, 'in_flight': 0}
+
+
+def test_distinct_keys_are_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+    keys = iter(range(WORKERS))
+    lock = threading.Lock()
+
+    def next_key():
+        with lock:
+            return next(keys)
+
+    results = run_concurrently(lambda: flight.do(next_key(), slow(calls)))
+    assert results == ['value'] * WORKERS
+    assert len(calls) == WORKERS
+
+
+def test_waiters_get_the_leaders_exception_and_the_next_call_retries():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.05)
+        raise RuntimeError('boom')
+
+    results = run_concurrently(lambda: flight.do('key', failing))
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.do('key', lambda: 'recovered') == 'recovered'
+
+
+def test_bounded_cache_misses_compute_once():
+    cache = BoundedCache(8)
+    calls = []
+    results = run_concurrently(lambda: cache.get_or_compute('key', slow(calls)))
+    assert results == ['value'] * WORKERS
+    assert len(calls) == 1
+    assert cache.info()['coalesced'] == WORKERS - 1
+
+
+def test_coalesced_lru_cache_computes_once():
+    calls = []
+
+    @coalesced
+    @lru_cache(maxsize=1)
+    def build(version):
+        return slow(calls, value=version)()
+
+    results = run_concurrently(lambda: build('v1'))
+    assert results == ['v1'] * WORKERS
+    assert len(calls) == 1
+    assert build.cache_info().currsize == 1
+    assert build.flight_info()['coalesced'] == WORKERS - 1
+
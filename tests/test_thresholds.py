@@ -0,0 +1,58 @@
+"""Precomputed percentile thresholds against np.percentile / Series.quantile."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import ThresholdTable, scope_county_stats
+
+
+@pytest.fixture(scope='module', params=[None, 'California'])
+def stats(request):
+    return scope_county_stats(state=request.param)
+
+
+@pytest.fixture(scope='module')
+def table(stats):
+    return ThresholdTable.from_county_stats(stats)
+
+
+def test_integer_percentiles_match_series_quantile(stats, table):
+    for percentile in range(101):
+        chronic, acute = table.thresholds(percentile)
+        assert chronic == pytest.approx(stats['mean_median_aqi'].quantile(percentile / 100), rel=1e-12)
+        assert acute == pytest.approx(stats['mean_max_aqi'].quantile(percentile / 100), rel=1e-12)
+
+
+def test_fractional_percentiles_match_np_percentile(stats, table):
+    for percentile in (80.5, 92.25, 99.9):
+        chronic, acute = table.thresholds(percentile)
+        assert chronic == pytest.approx(np.percentile(stats['mean_median_aqi'], percentile), rel=1e-12)
+        assert acute == pytest.approx(np.percentile(stats['mean_max_aqi'], percentile), rel=1e-12)
+
+
+def test_category_counts_match_masks(stats, table):
+    for percentile in range(80, 100):
+        chronic_threshold = stats['mean_median_aqi'].quantile(percentile / 100)
+        acute_threshold = stats['mean_max_aqi'].quantile(percentile / 100)
+        high_chronic = stats['mean_median_aqi'] >= chronic_threshold
+        high_acute = stats['mean_max_aqi'] >= acute_threshold
+        assert table.category_counts(percentile) == {
+            'Low Risk': int((~high_chronic & ~high_acute).sum()),
+            'High Chronic': int((high_chronic & ~high_acute).sum()),
+            'High Acute': int((~high_chronic & high_acute).sum()),
+            'Double Jeopardy': int((high_chronic & high_acute).sum()),
+        }
+        assert table.double_jeopardy_count(percentile) == int((high_chronic & high_acute).sum())
+
+
+def test_count_at_or_above_matches_a_scan(stats, table):
+    for metric in ('mean_median_aqi', 'mean_max_aqi'):
+        for value in stats[metric].iloc[::7]:
+            assert table.count_at_or_above(metric, value) == int((stats[metric] >= value).sum())
+
+
+def test_empty_scope_has_nan_thresholds():
+    table = ThresholdTable.from_county_stats(pd.DataFrame({'mean_median_aqi': [], 'mean_max_aqi': []}))
+    assert all(np.isnan(value) for value in table.thresholds(90))
+    assert table.category_counts(90)['Double Jeopardy'] == 0
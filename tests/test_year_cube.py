@@ -0,0 +1,63 @@
+"""Year-range prefix-sum cube against a plain pandas groupby."""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import YearCube
+from data import county_dimension, load_data
+
+
+@pytest.fixture(scope='module')
+def df():
+    return load_data()
+
+
+@pytest.fixture(scope='module')
+def cube(df):
+    return YearCube.from_frame(df, county_dimension())
+
+
+def year_ranges(cube):
+    years = [int(year) for year in cube.years]
+    return [(lo, hi) for lo, hi in itertools.combinations_with_replacement(years, 2)]
+
+
+def groupby_stats(df, year_min, year_max):
+    rows = df[(df['Year'] >= year_min) & (df['Year'] <= year_max)]
+    stats = rows.groupby(['State', 'County'], observed=True).agg(
+        mean_median_aqi=('Median AQI', 'mean'),
+        mean_max_aqi=('Max AQI', 'mean'),
+        county_id=('county_id', 'first'),
+    ).reset_index()
+    stats[['State', 'County']] = stats[['State', 'County']].astype(str)
+    return stats.sort_values(['State', 'County']).reset_index(drop=True)
+
+
+def test_county_stats_match_groupby_for_every_year_range(df, cube):
+    for year_min, year_max in year_ranges(cube):
+        expected = groupby_stats(df, year_min, year_max)
+        actual = cube.county_stats(year_min, year_max)
+        actual = actual.sort_values(['State', 'County']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False, rtol=1e-12)
+
+
+def test_present_marks_counties_with_rows_in_range(df, cube):
+    for year_min, year_max in year_ranges(cube):
+        rows = df[(df['Year'] >= year_min) & (df['Year'] <= year_max)]
+        present = cube.county_ids[cube.present(year_min, year_max)]
+        assert set(present) == set(rows['county_id'])
+
+
+def test_published_arrays_round_trip(cube):
+    rebuilt = YearCube.from_arrays(cube.to_arrays(), cube.dimension)
+    year_min, year_max = int(cube.years[0]), int(cube.years[-1])
+    pd.testing.assert_frame_equal(rebuilt.county_stats(year_min, year_max), cube.county_stats(year_min, year_max))
+
+
+def test_arrays_for_another_dimension_are_rejected(cube):
+    arrays = cube.to_arrays()
+    arrays['counts'] = np.zeros((len(cube.dimension) + 1, arrays['counts'].shape[1]))
+    assert YearCube.from_arrays(arrays, cube.dimension) is None